@@ -1,14 +1,18 @@
 import tkinter as tk
 from datetime import datetime
 import os
+import sys
+import time
+import queue
 
 from screens.home import HomeScreen
 from screens.settings import SettingsScreen
 from screens.idle import IdleScreen
 from screens.chat import ChatScreen
 from shared.utils import time_strings
-from shared.bot import ChatbotAssistant
+from shared.bot import load_assistant_async
 from shared.camera import CameraManager
+from shared.framebus import FrameBus
 from screens.capture import CaptureScreen
 from screens.train_faces import TrainFacesScreen
 
@@ -20,14 +24,24 @@ CYAN = "#70e2ff"
 DARK_BG = "#2b2b2b"
 
 class App(tk.Tk):
-    def __init__(self, name_text="(name)"):
+    # camera_source: device index, or a video file / image folder to replay
+    def __init__(self, name_text="(name)", camera_source=0):
         super().__init__()
         self.title("TestingGUI")
         self.geometry(f"{APP_W}x{APP_H}")
         self.resizable(False, False)
         self.configure(bg=DARK_BG)
 
-        self.camera = CameraManager(width=1280, height=720)
+        # low-res MJPG stream for preview/recognition; 1280x720 stills on demand
+        self.camera = CameraManager(index=camera_source, width=1280, height=720,
+                                    analysis_size=(640, 360), fourcc="MJPG")
+        # camera health changes arrive on the camera's thread; hop them onto Tk
+        self._camera_events = queue.Queue()
+        self.camera.add_state_listener(self._camera_events.put)
+        self.camera_state = self.camera.state
+        # one BGR->RGB conversion per frame, shared by preview and recognition
+        self.frames = FrameBus(self.camera)
+        self.frames.start()
         self.name_text = name_text
 
         self.top = tk.Frame(self, bg=CYAN, highlightthickness=0)
@@ -74,7 +88,9 @@ class App(tk.Tk):
         model  = os.path.join(base, "chatbot_model.pth")
         dims   = os.path.join(base, "dimensions.json")
 
-        self.assistant = ChatbotAssistant(intents_path=intents, model_path=model, dimensions_path=dims)
+        # loads (tokenizer, intents, weights) in the background; the window
+        # comes up immediately and ChatScreen waits on the Future
+        self.assistant = load_assistant_async(intents_path=intents, model_path=model, dimensions_path=dims)
         
         self.register_screen("home", HomeScreen(self.top, self))
         self.register_screen("settings", SettingsScreen(self.top, self))
@@ -85,11 +101,13 @@ class App(tk.Tk):
         #Timeout counting
         self.idle_ms = 10_000
         self._idle_after = None
+        self._waking = False
         self._install_activity_hooks()
 
         #First show
         self.show("home")
         self.update_clock()
+        self._drain_camera_events()
         self._reset_idle_timer()
 
         self.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -136,6 +154,20 @@ class App(tk.Tk):
         self.date_lbl.config(text=d_str)
         self.after(1000, self.update_clock)
 
+    def _drain_camera_events(self):
+        changed = False
+        while True:
+            try:
+                self.camera_state = self._camera_events.get_nowait()
+                changed = True
+            except queue.Empty:
+                break
+        if changed:
+            screen = self.screens.get(self.current)
+            if hasattr(screen, "on_camera_state"):
+                screen.on_camera_state(self.camera_state)
+        self.after(100, self._drain_camera_events)
+
     #Idle detection
     def _install_activity_hooks(self):
         for seq in ("<Motion>", "<Button>", "<Key>"):
@@ -152,19 +184,43 @@ class App(tk.Tk):
 
     def _go_idle(self):
         self.show("idle")
-        self.camera.release()
+        # keep the device open at a trickle so waking needs no reopen
+        self.camera.set_low_power(True)
+
+    def wake(self):
+        """Leave idle: restore the full stream, then show Home once it flows."""
+        if self.current != "idle" or self._waking:
+            return
+        self._waking = True
+        self.camera.open()
+        self.camera.set_low_power(False)
+        self._await_stream(time.monotonic() + 1.0)
+
+    def _await_stream(self, deadline):
+        # pre-warm: wait (briefly) for the first frame that is no longer idle-sized
+        item = self.camera.latest()
+        ready = item is not None and item[2].shape[1] != self.camera.low_power_size[0]
+        if ready or time.monotonic() >= deadline:
+            self._waking = False
+            if self.current == "idle":
+                self.show("home")
+            return
+        self.after(20, self._await_stream, deadline)
 
     def on_activity(self, event=None):
         if self.current == "idle":
-            self.show("home")
-            self.camera.open()
-
+            self.wake()
         else:
             self._reset_idle_timer()
 
     def on_close(self):
+        for screen in self.screens.values():
+            if hasattr(screen, "close"):
+                screen.close()
+        self.frames.stop()
         self.camera.release()
         self.destroy()
 
 if __name__ == "__main__":
-    App(name_text="(name)").mainloop()
+    # python main.py [video-file-or-image-folder]
+    App(name_text="(name)", camera_source=sys.argv[1] if len(sys.argv) > 1 else 0).mainloop()
@@ -1,8 +1,11 @@
 # screens/capture.py
 import os
+import time
 import tkinter as tk
 from tkinter import messagebox
-from PIL import Image, ImageTk
+
+from shared.preview import PreviewRenderer
+from shared.photowriter import PhotoWriter
 
 CYAN = "#70e2ff"
 
@@ -11,8 +14,10 @@ class CaptureScreen(tk.Frame):
     Photo capture screen:
     - Live camera preview
     - Name input
-    - Capture button (and Space key)
-    - Saves to dataset/<name>/<name>_YYYYmmdd_HHMMSS.jpg
+    - Capture button (and Space key); Burst > 1 takes that many
+      full-resolution frames, Interval ms apart
+    - Frames pass blur / face / duplicate checks and are written in the
+      background to dataset/<name>/<name>_YYYYmmdd_HHMMSS_mmm_<n>.jpg
     """
     def __init__(self, parent, app):
         super().__init__(parent, bg=CYAN)
@@ -32,6 +37,15 @@ class CaptureScreen(tk.Frame):
         self.name_entry = tk.Entry(toolbar, textvariable=self.name_var, font=("Segoe UI", 12), width=24)
         self.name_entry.pack(side="left", padx=(0, 12), ipady=2)
 
+        tk.Label(toolbar, text="Burst:", bg=CYAN, font=("Segoe UI", 12)).pack(side="left", padx=(0, 4))
+        self.burst_var = tk.IntVar(value=1)   # 1 = single shot; raise it to opt into bursts
+        tk.Spinbox(toolbar, from_=1, to=30, textvariable=self.burst_var, width=3,
+                   font=("Segoe UI", 12)).pack(side="left", padx=(0, 10))
+        tk.Label(toolbar, text="Interval ms:", bg=CYAN, font=("Segoe UI", 12)).pack(side="left", padx=(0, 4))
+        self.interval_var = tk.IntVar(value=200)
+        tk.Spinbox(toolbar, from_=50, to=2000, increment=50, textvariable=self.interval_var, width=5,
+                   font=("Segoe UI", 12)).pack(side="left", padx=(0, 10))
+
         self.count_lbl = tk.Label(toolbar, text="Saved: 0", bg=CYAN, font=("Segoe UI", 12))
         self.count_lbl.pack(side="left", padx=8)
 
@@ -43,10 +57,14 @@ class CaptureScreen(tk.Frame):
         self.preview.pack(fill="both", expand=True, padx=6, pady=(0, 6))
 
         # state
-        self._imgtk_cache = None
         self._loop_running = False
         self._saved_count = 0
-        self._last_frame_pil = None  # keep last grabbed frame (PIL RGB)
+        self._renderer = PreviewRenderer(self.preview)
+        self._sub = None
+        self._writer = PhotoWriter()   # quality gates + JPEG encoding off the Tk thread
+        self._capture_after = None     # polling a still request from the camera
+        self.capture_timeout = 3.0     # seconds to wait for the camera's full-resolution still
+        self._last_error = None
 
         # Key binding for Space capture (bound when shown)
         self._space_binding_added = False
@@ -56,6 +74,8 @@ class CaptureScreen(tk.Frame):
         # ensure camera is on
         self.app.camera.open()
         self._loop_running = True
+        self._sub = self.app.frames.subscribe(name="capture-preview")
+        self.on_camera_state(self.app.camera_state)
         self._render_loop()
         # focus name on first open
         self.after(50, lambda: self.name_entry.focus_set())
@@ -65,29 +85,55 @@ class CaptureScreen(tk.Frame):
 
     def on_hide(self):
         self._loop_running = False
-        self.preview.configure(image="", bg=CYAN)
+        self._cancel_capture()
+        if self._sub is not None:
+            self._sub.close()
+            self._sub = None
+        self._renderer.clear()
+
+    def on_camera_state(self, state):
+        # placeholder while the camera supervisor (re)opens the device
+        if state == "opening":
+            self._renderer.clear(text="Connecting to camera…")
+        elif state in ("lost", "closed"):
+            self._renderer.clear(text="Camera disconnected – reconnecting…")
+        elif state == "ended":
+            self._renderer.clear(text="End of recording")
 
     # preview loop
     def _render_loop(self):
         if not self._loop_running:
             return
-        frame = self.app.camera.read_rgb_frame()  # PIL.Image (RGB) or None
-        if frame is not None:
-            self._last_frame_pil = frame  # keep latest for saving
+        item = self._sub.get() if self._sub is not None else None  # (seq, ts, rgb) or None
+        if item is not None:
+            seq, _, frame = item
             w = max(10, int(self.preview.winfo_width() or 10))
             h = max(10, int(self.preview.winfo_height() or 10))
             if w > 10 and h > 10:
-                scale = min(w / frame.width, h / frame.height)
-                nw, nh = max(1, int(frame.width * scale)), max(1, int(frame.height * scale))
-                img_resized = frame.resize((nw, nh))
-                from PIL import Image
-                bg = Image.new("RGB", (w, h), (112, 226, 255))
-                bg.paste(img_resized, ((w - nw) // 2, (h - nh) // 2))
-                imgtk = ImageTk.PhotoImage(bg)
-                self._imgtk_cache = imgtk
-                self.preview.configure(image=imgtk)
+                self._renderer.render(frame, seq, w, h)
+        self._poll_writer()
         self.after(33, self._render_loop)
 
+    def _poll_writer(self):
+        done = self._writer.results()
+        if not done:
+            return
+        for path, reason in done:
+            if path is not None:
+                self._saved_count += 1
+            elif reason.startswith(("write failed", "check failed")):
+                self._last_error = reason
+        self._show_counts()
+
+    def _show_counts(self):
+        text = f"Saved: {self._saved_count}"
+        rejected = self._writer.rejected
+        if rejected:
+            text += "  Skipped: " + ", ".join(f"{k} {v}" for k, v in sorted(rejected.items()))
+        if self._last_error:
+            text += f"  ({self._last_error})"
+        self.count_lbl.config(text=text)
+
     # saving
     def _ensure_folder(self, name):
         base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # project root
@@ -97,36 +143,56 @@ class CaptureScreen(tk.Frame):
 
     def capture(self):
         name = self.name_var.get().strip() or "Subject1"
-        if self._last_frame_pil is None:
-            messagebox.showwarning("No Frame", "No camera frame available yet.")
-            return
-        folder = self._ensure_folder(name)
-
-        # Construct filename
-        from datetime import datetime
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{name}_{ts}.jpg"
-        path = os.path.join(folder, filename)
-
-        # Save image; prefer OpenCV (BGR) if available to match your previous script
+        if self._capture_after is not None:
+            return  # a capture is already running
         try:
-            import cv2
-            import numpy as np
-            rgb = np.array(self._last_frame_pil)               # RGB
-            bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
-            ok = cv2.imwrite(path, bgr)
-            if not ok:
-                raise RuntimeError("cv2.imwrite returned False")
-        except Exception:
-            # fallback to PIL save
-            try:
-                self._last_frame_pil.save(path, format="JPEG", quality=95)
-            except Exception as e:
-                messagebox.showerror("Save Failed", f"Could not save image:\n{e}")
+            count = max(1, int(self.burst_var.get()))
+            interval = max(10, int(self.interval_var.get()))
+        except (tk.TclError, ValueError):
+            count, interval = 1, 200
+        folder = self._ensure_folder(name)
+        self._writer.reset_gate()
+
+        # full-resolution stills for enrollment, grabbed by the camera thread
+        # (a burst in one switch up to full size); the Tk loop only polls
+        if count == 1:
+            fut = self.app.camera.request_still()
+        else:
+            fut = self.app.camera.request_burst(count, interval / 1000.0)
+        deadline = time.monotonic() + self.capture_timeout + (count - 1) * interval / 1000.0
+        self._await_capture(fut, folder, name, deadline)
+
+    def _await_capture(self, fut, folder, name, deadline):
+        self._capture_after = None
+        if not fut.done():
+            if self._loop_running and time.monotonic() < deadline:
+                self._capture_after = self.after(30, self._await_capture, fut, folder, name, deadline)
                 return
-
-        self._saved_count += 1
-        self.count_lbl.config(text=f"Saved: {self._saved_count}")
+            fut.cancel()   # camera too slow (or screen left); a late result is ignored
+        frames = []
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            result = fut.result()
+            frames = [f for f in (result if isinstance(result, list) else [result]) if f is not None]
+        for frame in frames:
+            self._writer.submit(frame, folder, name, bgr=True)
+        if not frames and self._loop_running:
+            # never fall back to the low-res preview: it would dilute the enrollment set
+            self._last_error = "no full-resolution photo"
+            self._show_counts()
+            messagebox.showwarning("No Photo", "The camera did not deliver a full-resolution "
+                                               "photo in time. Nothing was saved.")
+
+    def _cancel_capture(self):
+        if self._capture_after is not None:
+            try:
+                self.after_cancel(self._capture_after)
+            except Exception:
+                pass
+            self._capture_after = None
+
+    def close(self):
+        self._cancel_capture()
+        self._writer.close(wait=True)   # let queued photos reach the disk
 
     def _on_space(self, event):
         # Capture on spacebar
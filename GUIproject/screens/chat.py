@@ -1,11 +1,15 @@
 import tkinter as tk
 
+from shared.chatworker import ReplyWorker
+
 class ChatScreen(tk.Frame):
     def __init__(self, parent, app, assistant):
         super().__init__(parent, bg="#d9d9d9")
         self.app = app
-        self.assistant = assistant  #preloaded bot from main.py
+        self.assistant = assistant  #bot from main.py: an assistant, or a Future still loading one
         self._greeted = False 
+        self._replies = ReplyWorker()   # tokenize/inference/mapped functions run off the Tk thread
+        self._poll_after = None
 
         # === Outer wrapper (centered in screen) ===
         wrapper = tk.Frame(self, bg="#d9d9d9")
@@ -50,9 +54,36 @@ class ChatScreen(tk.Frame):
             self.add_message("bot", "Hello, what can I help you?")
             self._greeted = True
 
+        if self._poll_after is None:
+            self._poll_replies()
+
     def on_hide(self):
-        # nothing to clean up yet
-        pass
+        # replies still pending belong to a conversation nobody is looking at
+        self._replies.cancel()
+        if self._poll_after is not None:
+            self.after_cancel(self._poll_after)
+            self._poll_after = None
+
+    def close(self):
+        self._replies.close()
+
+    def _poll_replies(self):
+        for r in self._replies.results():
+            self.add_message("bot", r.reply)
+        self._poll_after = self.after(30, self._poll_replies)
+
+    def _ready_assistant(self):
+        """(assistant or None, status) where status is "ready", "loading" or "failed"."""
+        a = self.assistant
+        if a is None:
+            return None, "loading"
+        if not hasattr(a, "done"):
+            return a, "ready"
+        if not a.done():
+            return None, "loading"
+        if a.exception() is not None:
+            return None, "failed"
+        return a.result(), "ready"
 
     # --- bubble helpers (two lanes meeting in middle) ---
     def add_message(self, sender, text):
@@ -91,12 +122,13 @@ class ChatScreen(tk.Frame):
         self.entry.delete(0, "end")
         self.add_message("user", text)
 
-        def bot_reply():
-            if not self.assistant:
-                self.add_message("bot", "Loading my brain… please try again in a moment.")
-                return
-            reply = self.assistant.reply(text)
-            self.add_message("bot", reply)
-
-        # Non-blocking so UI stays responsive
-        self.after(10, bot_reply)
+        assistant, status = self._ready_assistant()
+        if status == "failed":
+            self.add_message("bot", "Sorry, my brain couldn’t be loaded.")
+            return
+        if assistant is None:
+            self.add_message("bot", "Loading my brain… please try again in a moment.")
+            return
+        # Non-blocking: the reply is computed on the worker thread, in send
+        # order, and posted by _poll_replies
+        self._replies.submit(assistant, text)
@@ -1,19 +1,26 @@
 # screens/home.py
 import tkinter as tk
-from PIL import Image, ImageTk, ImageDraw
 import os
 
 from shared.faceid import FaceIdentifier
+from shared.facepool import PooledFaceIdentifier
+from shared.recognizer import RecognitionWorker
+from shared.motion import MotionGate
+from shared.preview import PreviewRenderer
+from shared.overlay import OverlayLayer
 
 CYAN = "#70e2ff"
 
 class HomeScreen(tk.Frame):
-    def __init__(self, parent, app):
+    # engine: "thread" runs FaceIdentifier on one background thread,
+    #         "process" fans recognition out to a process pool (multi-core)
+    def __init__(self, parent, app, engine="thread"):
         super().__init__(parent, bg=CYAN)
         self.app = app
 
-        # Camera preview label (fills the screen area)
-        self.preview = tk.Label(self, bg=CYAN, bd=0)
+        # Camera preview canvas (fills the screen area): video image item with
+        # the recognition overlay as canvas items on top
+        self.preview = tk.Canvas(self, bg=CYAN, bd=0, highlightthickness=0)
         self.preview.place(relx=0.5, rely=0.5, anchor="center",
                            relwidth=1.0, relheight=1.0)
 
@@ -30,69 +37,83 @@ class HomeScreen(tk.Frame):
 
         # --- Face ID setup ---
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        enc_path = os.path.join(project_root, "encodings.pickle")
-        self.faceid = FaceIdentifier(encodings_path=enc_path, scaler=4, model="large")
-
-        self._imgtk_cache = None
+        enc_path = os.path.join(project_root, "encodings.f32")
+        # Recognition runs at a fixed analysis width, independent of the preview size.
+        # The process engine has no adaptive controller (see shared/facepool.py), so
+        # it is pinned to the controller's default level: scaler 2, large model.
+        if engine == "process":
+            self.faceid = PooledFaceIdentifier(encodings_path=enc_path, scaler=2, model="large",
+                                               analysis_width=640)
+        else:
+            # the gallery and its index are built on a loader thread, not during App startup
+            self.faceid = FaceIdentifier(encodings_path=enc_path, analysis_width=640,
+                                         adaptive=True, budget_ms=60, background_load=True)
+        # detection/encoding runs here, off the Tk thread; static frames are skipped
+        self.recognizer = RecognitionWorker(self.faceid, gate=MotionGate())
+
+        self._renderer = PreviewRenderer(self.preview)
+        self._overlay = OverlayLayer(self.preview)
         self._loop_running = False
+        self._sub = None        # preview frames from app.frames
+        self._rec_sub = None    # recognition frames, pulled by the worker thread
 
     def on_show(self):
         # Re-open camera when returning from Idle
         self.app.camera.open()
         self._loop_running = True
+        self._sub = self.app.frames.subscribe(name="home-preview")
+        self._rec_sub = self.app.frames.subscribe(name="home-recognition")
+        self.recognizer.start(source=self._rec_sub)
+        self.on_camera_state(self.app.camera_state)
         self._render_loop()
 
     def on_hide(self):
         self._loop_running = False
-        self.preview.configure(image="", bg=CYAN)
+        self.recognizer.stop()
+        for sub in (self._sub, self._rec_sub):
+            if sub is not None:
+                sub.close()
+        self._sub = self._rec_sub = None
+        self._renderer.clear()
+        self._overlay.clear()
+
+    def on_camera_state(self, state):
+        # placeholder while the camera supervisor (re)opens the device
+        if state != "live":
+            self._overlay.clear()
+        if state == "opening":
+            self._renderer.clear(text="Connecting to camera…")
+        elif state in ("lost", "closed"):
+            self._renderer.clear(text="Camera disconnected – reconnecting…")
+        elif state == "ended":
+            self._renderer.clear(text="End of recording")
+
+    def close(self):
+        self.recognizer.stop()
+        if hasattr(self.faceid, "close"):
+            self.faceid.close()
 
     def _render_loop(self):
         if not self._loop_running:
             return
 
-        # 1) Grab a frame from the camera as a PIL RGB image
-        frame = self.app.camera.read_rgb_frame()
+        # 1) Newest shared RGB frame from the frame bus; None means nothing new
+        item = self._sub.get() if self._sub is not None else None
 
-        if frame is not None:
-            # 2) Fit into current widget while keeping aspect ratio; compose onto cyan background
+        if item is not None:
+            seq, _, frame = item
+            # 2) Pure blit: letterbox into the preview's persistent PhotoImage
             w = int(self.winfo_width() or 10)
             h = int(self.winfo_height() or 10)
             if w > 10 and h > 10:
-                scale = min(w / frame.width, h / frame.height)
-                nw, nh = max(1, int(frame.width * scale)), max(1, int(frame.height * scale))
-                img_resized = frame.resize((nw, nh))
-
-                # 3) FACE RECOGNITION on the resized image (faster and matches drawn coords)
-                boxes, names, fps = self.faceid.annotate_pil(img_resized)
-
-                # 4) Draw boxes, labels, and FPS on the resized image
-                draw = ImageDraw.Draw(img_resized)
-                for (top, right, bottom, left), name in zip(boxes, names):
-                    # box
-                    draw.rectangle([left, top, right, bottom], outline=(244, 42, 3), width=3)
-                    # label background
-                    label_h = 26
-                    draw.rectangle([left-3, top - label_h, right+3, top], fill=(244, 42, 3))
-                    # label text (use simple draw.text; Pillow default font)
-                    draw.text((left+6, top - label_h + 4), name or "Unknown", fill=(255, 255, 255))
-
-                # FPS (top-right)
-                fps_text = f"FPS: {fps:.1f}"
-                tw, th = draw.textlength(fps_text), 14
-                # simple black bg behind text
-                draw.rectangle([img_resized.width-120, 6, img_resized.width-6, 28], fill=(0, 0, 0))
-                draw.text((img_resized.width-114, 8), fps_text, fill=(0, 255, 0))
-
-                # 5) Paste into cyan background
-                from PIL import Image
-                bg = Image.new("RGB", (w, h), (112, 226, 255))
-                bg.paste(img_resized, ((w - nw) // 2, (h - nh) // 2))
-
-                imgtk = ImageTk.PhotoImage(bg)
-                self._imgtk_cache = imgtk
-                self.preview.configure(image=imgtk, bg=CYAN)
-        else:
-            self.preview.configure(image="", bg=CYAN)
+                self._renderer.render(frame, seq, w, h)
+
+        # 3) FACE RECOGNITION runs on the worker thread, which pulls the same
+        #    frames from its own subscription; the overlay items only move
+        #    when its result (or the picture geometry) changes
+        res = self.recognizer.latest()
+        if res is not None and self._renderer.geometry is not None and self.app.camera_state == "live":
+            self._overlay.update(res.boxes, res.names, res.fps, res.size, self._renderer.geometry)
 
         # Aim ~30 fps for the UI loop
         self.after(33, self._render_loop)
@@ -1,16 +1,53 @@
+import time
 import tkinter as tk
 
+from shared.motion import MotionGate
+
 class IdleScreen(tk.Frame):
-    """Shown after 10s of inactivity. Any activity goes back to Home."""
-    def __init__(self, parent, app):
+    """
+    Shown after 10s of inactivity. Any activity goes back to Home.
+    While shown, the camera runs in low-power mode and a tiny motion check at
+    ~2 fps wakes the app when someone walks up.
+    """
+    def __init__(self, parent, app, poll_ms=500, settle_s=2.0):
         super().__init__(parent, bg="#d9d9d9")
         self.app = app
         self.label = tk.Label(self, text="Placeholder", bg="#d9d9d9",
                               font=("Segoe UI", 16))
         self.label.place(relx=0.5, rely=0.5, anchor="center")
 
+        self.poll_ms = poll_ms
+        self.settle_s = settle_s   # ignore motion while exposure adjusts to the new mode
+        # max_skip is effectively off: only real change counts as presence
+        self._gate = MotionGate(thumb_size=(32, 24), pixel_threshold=24,
+                                area_threshold=0.05, max_skip=10**9)
+        self._sub = None
+        self._after = None
+        self._shown_at = 0.0
+        self._primed = False
+
     def on_show(self):
-        pass
+        self._gate.reset()
+        self._primed = False
+        self._shown_at = time.monotonic()
+        self._sub = self.app.frames.subscribe(name="idle-presence")
+        self._after = self.after(self.poll_ms, self._poll)
 
     def on_hide(self):
-        pass
+        if self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+        if self._sub is not None:
+            self._sub.close()
+            self._sub = None
+
+    def _poll(self):
+        self._after = None
+        item = self._sub.get() if self._sub is not None else None
+        if item is not None and time.monotonic() - self._shown_at >= self.settle_s:
+            moved = self._gate.changed(item[2])
+            if moved and self._primed:
+                self.app.wake()
+                return
+            self._primed = True   # first settled frame is the reference
+        self._after = self.after(self.poll_ms, self._poll)
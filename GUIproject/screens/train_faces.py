@@ -1,5 +1,6 @@
 # screens/train_faces.py
 import os
+import time
 import threading
 import queue
 import tkinter as tk
@@ -10,7 +11,8 @@ from tkinter import ttk, messagebox
 
 class TrainFacesScreen(tk.Frame):
     """
-    Builds encodings.pickle from dataset/<name>/*.jpg using face_recognition.
+    Builds the encodings store (encodings.f32 + .names, see shared/encstore.py)
+    from dataset/<name>/*.jpg using face_recognition.
     UI:
       - Start button
       - Progress bar + counter
@@ -49,6 +51,8 @@ class TrainFacesScreen(tk.Frame):
         self.prog.pack(fill="x", expand=True)
         self.count_lbl = tk.Label(prog_row, text="0 / 0", bg="#d9d9d9", font=("Segoe UI", 11))
         self.count_lbl.pack(anchor="e", pady=(4, 0))
+        self.rate_lbl = tk.Label(prog_row, text="", bg="#d9d9d9", font=("Segoe UI", 11))
+        self.rate_lbl.pack(anchor="e")
 
         # Log
         log_wrap = tk.Frame(body, bg="#d9d9d9")
@@ -84,6 +88,7 @@ class TrainFacesScreen(tk.Frame):
         self.log.delete("1.0", "end")
         self.prog["value"] = 0
         self.count_lbl.config(text="0 / 0")
+        self.rate_lbl.config(text="")
 
         # Start worker
         self._stop_flag = False
@@ -95,61 +100,76 @@ class TrainFacesScreen(tk.Frame):
 
     def _train_worker(self, dataset_dir):
         """
-        Runs in background thread: scan dataset, compute encodings, save pickle.
+        Runs in background thread: scan dataset, compute encodings, save the store.
         Mirrors your CLI script but posts progress into a Tk queue.
+        Per-image results are cached (train_cache.json/.npy), so only added or
+        changed images are encoded, and only their rows are appended to (or
+        tombstoned in) the store.
+        Encoding is spread over a process pool (shared/trainpool.py).
         """
         try:
             from imutils import paths
-            import face_recognition
-            import cv2
-            import pickle
-            import numpy as np
+            from shared.encstore import EncodingStore
+            from shared.traincache import TrainingCache
+            from shared.trainpool import encode_images
+
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache = TrainingCache(os.path.join(project_root, "train_cache.json")).load()
 
             imagePaths = list(paths.list_images(dataset_dir))
-            total = len(imagePaths)
+            removed = cache.prune(imagePaths)
+            todo = [p for p in imagePaths if not cache.is_fresh(p)]
+            total = len(todo)
+            self._q.put(("log", f"[INFO] {len(imagePaths) - total} cached, {total} new/changed, "
+                                f"{removed} removed"))
             self._q.put(("total", total))
 
-            knownEncodings = []
-            knownNames = []
-
-            for (i, imagePath) in enumerate(imagePaths, start=1):
-                if self._stop_flag:
-                    break
-
+            t0 = time.time()
+            results = encode_images(todo, should_stop=lambda: self._stop_flag)
+            for (i, (imagePath, encodings)) in enumerate(results, start=1):
                 name = imagePath.split(os.path.sep)[-2]
-                self._q.put(("log", f"[INFO] processing image {i}/{total}: {imagePath}"))
+                self._q.put(("log", f"[INFO] processed image {i}/{total}: {imagePath}"))
                 self._q.put(("prog", (i, total)))
+                elapsed = max(1e-6, time.time() - t0)
+                rate = i / elapsed
+                self._q.put(("rate", (rate, (total - i) / rate)))
 
-                image = cv2.imread(imagePath)
-                if image is None:
-                    self._q.put(("log", f"[WARN] cannot read image: {imagePath}"))
+                if encodings is None:
+                    self._q.put(("log", f"[WARN] cannot read or encode image: {imagePath}"))
                     continue
+                cache.put(imagePath, name, encodings)
 
-                rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-                # You can switch model="cnn" if you have dlib GPU and want accuracy over speed
-                boxes = face_recognition.face_locations(rgb, model="hog")
-                encodings = face_recognition.face_encodings(rgb, boxes)
-
-                for encoding in encodings:
-                    knownEncodings.append(encoding)
-                    knownNames.append(name)
-
-            # Save encodings
-            data = {"encodings": knownEncodings, "names": knownNames}
-
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            out_path = os.path.join(project_root, "encodings.pickle")
-            with open(out_path, "wb") as f:
-                import pickle
-                f.write(pickle.dumps(data))
+            # Keep whatever was encoded, even if stopped early: only the rows of
+            # new/changed/removed images touch the store
+            out_path = os.path.join(project_root, "encodings.f32")
+            written = cache.sync_store(EncodingStore(out_path))
+            cache.save()
+            self._q.put(("log", f"[INFO] {written} encodings written"))
 
             self._q.put(("log", f"[INFO] Training complete. Encodings saved to '{out_path}'"))
+            # reload (and re-index) the live gallery here, not on the Tk thread
+            if self._reload_home(out_path):
+                self._q.put(("log", "[INFO] Home recognizer reloaded."))
             self._q.put(("done", out_path))
 
         except Exception as e:
             self._q.put(("error", str(e)))
 
+    def _reload_home(self, path):
+        """
+        Refresh face encodings in Home if it has a recognizer. Runs on the
+        training thread: building the index (IVF k-means) can take a while, and
+        the new gallery is swapped in under the recognizer's own lock.
+        """
+        try:
+            home = getattr(self.app, "screens", {}).get("home")
+            if home is not None and hasattr(home, "faceid"):
+                home.faceid.reload(path)
+                return True
+        except Exception as e:
+            self._q.put(("log", f"[WARN] could not reload Home recognizer: {e}"))
+        return False
+
     def _drain_logs(self):
         """Pump messages from the worker into the UI thread."""
         try:
@@ -166,17 +186,12 @@ class TrainFacesScreen(tk.Frame):
                     self.prog["maximum"] = max(1, int(total))
                     self.prog["value"] = int(i)
                     self.count_lbl.config(text=f"{i} / {total}")
+                elif kind == "rate":
+                    ips, eta = payload
+                    eta = int(eta)
+                    self.rate_lbl.config(text=f"{ips:.1f} img/s, ETA {eta // 60}:{eta % 60:02d}")
                 elif kind == "done":
                     self._log("[INFO] Done.")
-                    # Optional: refresh face encodings in Home if using FaceIdentifier
-                    try:
-                        if hasattr(self.app, "screens") and "home" in self.app.screens:
-                            home = self.app.screens["home"]
-                            if hasattr(home, "faceid"):
-                                home.faceid.reload(payload)
-                                self._log("[INFO] Home recognizer reloaded.")
-                    except Exception:
-                        pass
                 elif kind == "error":
                     self._log(f"[ERROR] {payload}")
                     messagebox.showerror("Training Error", payload)
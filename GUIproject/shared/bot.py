@@ -1,68 +1,136 @@
-import os, json, random, re
+import os, json, random, re, threading
+from concurrent.futures import Future
+from functools import lru_cache
 import numpy as np
 
-try:
-    import nltk
-    from nltk.stem import WordNetLemmatizer
-    from nltk.tokenize import word_tokenize
-    NLTK_OK = True
-except Exception:
-    NLTK_OK = False
-    WordNetLemmatizer = None
-    word_tokenize = None
-
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-
-class ChatbotModel(nn.Module):
-    def __init__(self, input_size, output_size):
-        super().__init__()
-        self.fc1 = nn.Linear(input_size, 128)
-        self.fc2 = nn.Linear(128, 64)
-        self.fc3 = nn.Linear(64, output_size)
-        self.relu = nn.ReLU()
-        self.dropout = nn.Dropout(0.5)
-
-    def forward(self, x):
-        x = self.relu(self.fc1(x)); x = self.dropout(x)
-        x = self.relu(self.fc2(x)); x = self.dropout(x)
-        x = self.fc3(x)
-        return x
+from shared.npmodel import NumpyChatModel, export_npz, npz_path_for, is_fresh, load_pth
+
+# torch is only imported for backend="torch" (or a .pth the NumPy loader can't
+# read); the kiosk otherwise runs the NumPy engine in shared/npmodel.py
+_MODEL_CLASS = None
+
+def _chatbot_model_class():
+    global _MODEL_CLASS
+    if _MODEL_CLASS is None:
+        import torch.nn as nn
+
+        class ChatbotModel(nn.Module):
+            def __init__(self, input_size, output_size):
+                super().__init__()
+                self.fc1 = nn.Linear(input_size, 128)
+                self.fc2 = nn.Linear(128, 64)
+                self.fc3 = nn.Linear(64, output_size)
+                self.relu = nn.ReLU()
+                self.dropout = nn.Dropout(0.5)
+
+            def forward(self, x):
+                x = self.relu(self.fc1(x)); x = self.dropout(x)
+                x = self.relu(self.fc2(x)); x = self.dropout(x)
+                x = self.fc3(x)
+                return x
+
+        _MODEL_CLASS = ChatbotModel
+    return _MODEL_CLASS
+
+def __getattr__(name):
+    # `from shared.bot import ChatbotModel` still works, importing torch on demand
+    if name == "ChatbotModel":
+        return _chatbot_model_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---- A safe tokenizer that works even if NLTK data isn't downloaded ----
-def safe_tokenize_and_lemmatize(text: str):
-    text = text or ""
-    tokens = []
-    if NLTK_OK:
+_WORD_RE = re.compile(r"[A-Za-z']+")
+
+class Tokenizer:
+    """
+    Tokenize + lemmatize, set up once.
+    NLTK is imported and its tokenizer/WordNet availability probed in __init__
+    (which also pays the slow first WordNet lookup), falling back to the
+    precompiled regex and plain lower-casing. Lemmas are memoized in a
+    bounded LRU; see stats().
+    """
+    def __init__(self, memo_size=4096):
+        self._tokenize = _WORD_RE.findall
+        self._lemmatizer = None
+        self.nltk_tokenize = False
         try:
-            # Try proper tokenization
-            tokens = word_tokenize(text)
-        except LookupError:
-            # Fallback: basic split on non-letters
-            tokens = re.findall(r"[A-Za-z']+", text)
+            from nltk.stem import WordNetLemmatizer
+            from nltk.tokenize import word_tokenize
+            nltk_ok = True
+        except Exception:
+            nltk_ok = False
+        if nltk_ok:
+            try:
+                word_tokenize("probe")
+                self._tokenize = word_tokenize
+                self.nltk_tokenize = True
+            except LookupError:
+                pass
+            try:
+                lem = WordNetLemmatizer()
+                lem.lemmatize("probe")
+                self._lemmatizer = lem
+            except Exception:
+                pass
+        self._lemma = lru_cache(maxsize=memo_size)(self._lemma_uncached)
+
+    def _lemma_uncached(self, token):
+        if self._lemmatizer is None:
+            return token
         try:
-            lem = WordNetLemmatizer()
-            tokens = [lem.lemmatize(t.lower()) for t in tokens]
+            return self._lemmatizer.lemmatize(token)
         except Exception:
-            tokens = [t.lower() for t in tokens]
-    else:
-        tokens = [t.lower() for t in re.findall(r"[A-Za-z']+", text)]
-    return tokens
+            return token
+
+    def __call__(self, text):
+        lemma = self._lemma
+        return [lemma(t.lower()) for t in self._tokenize(text or "")]
+
+    def stats(self):
+        info = self._lemma.cache_info()
+        total = info.hits + info.misses
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+                "hit_rate": info.hits / total if total else 0.0,
+                "nltk_tokenize": self.nltk_tokenize,
+                "wordnet": self._lemmatizer is not None}
+
+
+_TOKENIZER = None
+_TOKENIZER_LOCK = threading.Lock()
+
+def get_tokenizer():
+    """The shared Tokenizer, created on first use."""
+    global _TOKENIZER
+    with _TOKENIZER_LOCK:
+        if _TOKENIZER is None:
+            _TOKENIZER = Tokenizer()
+        return _TOKENIZER
+
+def safe_tokenize_and_lemmatize(text: str):
+    return get_tokenizer()(text)
 
 class ChatbotAssistant:
     """
     Thin wrapper around your training/inference code for GUI use.
     Only inference is used here.
+    backend: "auto" runs the NumPy engine from an .npz exported next to the
+    .pth (re-exported without torch whenever the .pth is newer) and only falls
+    back to torch if that fails; "numpy" / "torch" force one engine.
+    int8=True uses int8-quantized weights for the NumPy engine.
     """
-    def __init__(self, intents_path, model_path, dimensions_path, function_mappings=None):
+    def __init__(self, intents_path, model_path, dimensions_path, function_mappings=None,
+                 tokenizer=None, backend="auto", int8=False):
         self.model = None
+        self.backend = backend
+        self.int8 = int8
+        self.tokenizer = tokenizer or get_tokenizer()
         self.intents_path = intents_path
         self.model_path = model_path
         self.dimensions_path = dimensions_path
 
         self.documents = []
         self.vocabulary = []
+        self.word_index = {}     # vocabulary word -> feature column
         self.intents = []
         self.intents_responses = {}
         self.function_mappings = function_mappings or {}
@@ -77,8 +145,27 @@ class ChatbotAssistant:
         self._load_model()
 
     # === Original helpers (adapted to use safe tokenizer) ===
-    def _bag_of_words(self, words):
-        return [1 if w in words else 0 for w in self.vocabulary]
+    def _word_columns(self, words):
+        index = self.word_index
+        return [index[w] for w in words if w in index]
+
+    def _featurize(self, texts):
+        """(len(texts), V) float32 bag-of-words matrix, filled from token indices."""
+        rows, cols = [], []
+        for r, text in enumerate(texts):
+            c = self._word_columns(self.tokenizer(text))
+            rows.extend([r] * len(c))
+            cols.extend(c)
+        x = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        x[rows, cols] = 1.0
+        return x
+
+    def _logits(self, x):
+        if isinstance(self.model, NumpyChatModel):
+            return self.model(x)
+        import torch
+        with torch.no_grad():
+            return self.model(torch.from_numpy(x)).numpy()
 
     def _parse_intents(self):
         if not os.path.exists(self.intents_path):
@@ -93,19 +180,37 @@ class ChatbotAssistant:
                 self.intents.append(tag)
                 self.intents_responses[tag] = intent.get("responses", [])
             for pattern in intent.get("patterns", []):
-                p_words = safe_tokenize_and_lemmatize(pattern)
+                p_words = self.tokenizer(pattern)
                 self.vocabulary.extend(p_words)
                 self.documents.append((p_words, tag))
         self.vocabulary = sorted(set(self.vocabulary))
+        self.word_index = {w: i for i, w in enumerate(self.vocabulary)}
 
     def _load_model(self):
+        npz = npz_path_for(self.model_path, self.int8)
+        if self.backend != "torch":
+            if not is_fresh(npz, self.model_path) and os.path.exists(self.model_path):
+                try:
+                    export_npz(load_pth(self.model_path), npz, int8=self.int8)
+                except Exception:
+                    pass   # unreadable without torch (or read-only dir): fall through
+            if is_fresh(npz, self.model_path):
+                self.model = NumpyChatModel.load(npz)
+                self._loaded_ok = True
+                return
+            if self.backend == "numpy":
+                return
         if not (os.path.exists(self.model_path) and os.path.exists(self.dimensions_path)):
             return
+        try:
+            import torch
+        except ImportError:
+            return
         with open(self.dimensions_path, "r", encoding="utf-8") as f:
             dims = json.load(f)
         input_size = dims["input_size"]
         output_size = dims["output_size"]
-        self.model = ChatbotModel(input_size, output_size)
+        self.model = _chatbot_model_class()(input_size, output_size)
         # Support both torch>=2.0 (weights_only arg) and older
         try:
             state = torch.load(self.model_path, map_location="cpu", weights_only=True)
@@ -115,24 +220,34 @@ class ChatbotAssistant:
         self.model.eval()
         self._loaded_ok = True
 
-    # === Public method used by ChatScreen ===
+    def warm_up(self):
+        """One throwaway forward pass so the first real reply runs warm."""
+        if self._loaded_ok and self.vocabulary:
+            self._logits(self._featurize(["hello"]))
+
+    # === Public methods used by ChatScreen ===
     def reply(self, user_text: str) -> str:
         """
         Returns a bot reply string. If the model or files are missing,
         returns a safe default string.
         """
-        if not self._loaded_ok or not self.intents or not self.vocabulary:
-            return "Sorry, my brain (model files) isn’t loaded yet."
+        return self.reply_batch([user_text])[0]
 
-        words = safe_tokenize_and_lemmatize(user_text)
-        bow = self._bag_of_words(words)
-        x = torch.tensor([bow], dtype=torch.float32)
+    def reply_batch(self, texts):
+        """
+        Replies for many messages, classified in one forward pass (e.g. when
+        replaying chat logs). Same fallbacks as reply().
+        """
+        texts = list(texts)
+        if not self._loaded_ok or not self.intents or not self.vocabulary:
+            return ["Sorry, my brain (model files) isn’t loaded yet."] * len(texts)
+        if not texts:
+            return []
 
-        with torch.no_grad():
-            logits = self.model(x)
-            pred_idx = int(torch.argmax(logits, dim=1).item())
-        intent = self.intents[pred_idx]
+        pred = self._logits(self._featurize(texts)).argmax(axis=1)
+        return [self._respond(self.intents[int(i)]) for i in pred]
 
+    def _respond(self, intent):
         # Optional: trigger mapped function
         fn = self.function_mappings.get(intent)
         if callable(fn):
@@ -145,3 +260,27 @@ class ChatbotAssistant:
         if responses:
             return random.choice(responses)
         return f"(No response configured for intent: {intent})"
+
+
+def load_assistant_async(intents_path, model_path, dimensions_path, warm_up=True, **kwargs):
+    """
+    Build a ChatbotAssistant (and warm it up) on a background thread.
+    Returns a Future: result() is the assistant, exception() the load failure.
+    """
+    fut = Future()
+
+    def work():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            assistant = ChatbotAssistant(intents_path=intents_path, model_path=model_path,
+                                         dimensions_path=dimensions_path, **kwargs)
+            if warm_up:
+                assistant.warm_up()
+        except BaseException as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(assistant)
+
+    threading.Thread(target=work, name="assistant-load", daemon=True).start()
+    return fut
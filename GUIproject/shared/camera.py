@@ -1,3 +1,7 @@
+import threading, time
+from collections import deque
+from concurrent.futures import Future
+
 try:
     import cv2
     OPENCV_OK = True
@@ -7,36 +11,405 @@ except Exception:
 
 from PIL import Image
 
+from shared.replay import ReplaySource
+
 class CameraManager:
-    def __init__(self, index=0, width=1280, height=720): #change to index 1 if using USB camera
+    """
+    Owns the cv2.VideoCapture.
+    With threaded=True (default) a supervisor thread owns the device and drains
+    it into a small ring buffer of (seq, timestamp, bgr_frame), so latest() and
+    read_rgb_frame() never block the Tk thread. Stills and mode switches are
+    queued to that thread and come back as concurrent.futures.Futures.
+    """
+    def __init__(self, index=0, width=1280, height=720, threaded=True, buffer_size=3,
+                 analysis_size=None, fourcc=None,
+                 replay_pacing="realtime", replay_loop=True): #change to index 1 if using USB camera
+        # index may also be a video file or image directory, played back through
+        # shared/replay.py; without replay_loop the state ends at "ended"
         self.index = index
-        self.width = width
+        self.replay_pacing = replay_pacing   # "realtime" or "fast"
+        self.replay_loop = replay_loop
+        self.width = width                   # full resolution, used for stills
         self.height = height
+        # low-res (w, h) stream for preview/recognition; stills switch up to width x height
+        self.analysis_size = tuple(analysis_size) if analysis_size else None
+        self.fourcc = fourcc                 # e.g. "MJPG", to cut USB bandwidth
+        self.threaded = threaded
         self.cap = None
+        self._requests = deque()             # (fn(cap), Future) for the supervisor thread
+        self._req_lock = threading.Lock()
+
+        self._ring = deque(maxlen=max(1, int(buffer_size)))
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._read_seq = 0       # newest seq handed out by latest()/read_rgb_frame()
+        self.dropped = 0         # frames replaced before anyone read them
+        self._thread = None
+        self._running = False
+
+        self.low_power = False
+        self.low_power_size = (160, 120)
+        self.low_power_fps = 2
+        self._normal_fps = None
+        self._wake = threading.Event()
+
+        # health: "closed", "opening", "live", "lost" or "ended" (recording played out);
+        # add_state_listener() callbacks fire from the supervisor thread on every change
+        self.state = "closed"
+        self.reconnect_backoff = (0.5, 10.0)   # first and longest wait between reopen attempts
+        self.lost_after = 2.0                  # seconds without a frame before the stream counts as lost
+        self._listeners = []
+        self._halt = threading.Event()
+        self._gen = 0
         self.open()
 
     def open(self):
+        """
+        Start using the camera. Threaded, this only starts the supervisor and
+        returns at once; the device is opened in the background, with state
+        going opening -> live, or lost on failure. When frames stop for
+        lost_after seconds it is dropped and reopened with exponential backoff.
+        """
         if not OPENCV_OK:
             return
-        if self.cap and self.cap.isOpened():
+        if not self.threaded:
+            if not (self.cap and self.cap.isOpened()):
+                self._set_state("live" if self._open_device() is not None else "lost")
             return
+        self._start_grabber()
+
+    def _open_device(self, gen=None):
+        """Blocking open of the device or recording; the usable capture, or None."""
         try:
-            self.cap = cv2.VideoCapture(self.index)
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if isinstance(self.index, str):
+                cap = ReplaySource(self.index, pacing=self.replay_pacing, loop=self.replay_loop)
+            else:
+                cap = cv2.VideoCapture(self.index)
         except Exception:
+            return None
+        if not cap.isOpened() or (gen is not None and gen != self._gen):
+            cap.release()   # missing device, or release() was called while we waited
+            return None
+        try:
+            if self.fourcc:
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+            self._normal_fps = cap.get(cv2.CAP_PROP_FPS) or None
+            self._apply_low_power(cap, self.low_power)
+        except Exception:
+            cap.release()
+            return None
+        self.cap = cap
+        return cap
+
+    def _drop_device(self, cap):
+        if self.cap is cap:
             self.cap = None
+        if cap is not None:
+            try:
+                cap.release()
+            except Exception:
+                pass
 
-    def read_rgb_frame(self):
+    # requests to the supervisor thread
+    def _request(self, fn):
+        """Run fn(cap) on the thread that owns the device; Future of its result."""
+        fut = Future()
+        if not self.threaded:
+            self._run_request(fn, fut, self.cap)
+            return fut
+        with self._req_lock:
+            if self._running:
+                self._requests.append((fn, fut))
+                return fut
+        self._run_request(fn, fut, None)   # camera released: nobody will serve it
+        return fut
+
+    def _run_request(self, fn, fut, cap):
+        if not fut.set_running_or_notify_cancel():
+            return
+        if cap is None or not cap.isOpened():
+            fut.set_result(None)   # no device right now
+            return
+        try:
+            fut.set_result(fn(cap))
+        except Exception as e:
+            fut.set_exception(e)
+
+    def _service_requests(self, cap):
+        while True:
+            with self._req_lock:
+                if not self._requests:
+                    return
+                fn, fut = self._requests.popleft()
+            self._run_request(fn, fut, cap)
+
+    # health state
+    def add_state_listener(self, fn):
+        """fn(state) is called from the supervisor thread on every state change."""
+        self._listeners.append(fn)
+
+    def remove_state_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        for fn in list(self._listeners):
+            try:
+                fn(state)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _set_size(cap, w, h):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+
+    def _stream_size(self):
+        if self.low_power:
+            return self.low_power_size
+        return self.analysis_size or (self.width, self.height)
+
+    def set_low_power(self, enabled, size=None, fps=None):
+        """
+        Switch between the normal stream and a low-res, low-fps idle stream
+        (presence detection while idle). The device stays open, so switching
+        back needs no reopen. Returns a Future at once; the supervisor applies
+        the switch between frames (or on the next open if the device is down).
+        """
+        if size:
+            self.low_power_size = tuple(size)
+        if fps:
+            self.low_power_fps = fps
+        enabled = bool(enabled)
+        if enabled == self.low_power:
+            fut = Future()
+            fut.set_result(None)
+            return fut
+        self.low_power = enabled
+        if enabled:
+            self._wake.clear()
+        else:
+            self._wake.set()   # cut the grabber's idle sleep short
+        return self._request(lambda cap: self._apply_low_power(cap, enabled))
+
+    def _apply_low_power(self, cap, enabled):
+        if enabled:
+            self._set_size(cap, *self.low_power_size)
+            cap.set(cv2.CAP_PROP_FPS, self.low_power_fps)
+        else:
+            self._set_size(cap, *(self.analysis_size or (self.width, self.height)))
+            if self._normal_fps:
+                cap.set(cv2.CAP_PROP_FPS, self._normal_fps)
+
+    # supervisor / grabber thread
+    def _start_grabber(self):
+        if self._running and self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._gen += 1   # a thread still winding down from release() sees a stale gen and exits
+        self._halt.clear()
+        if self.low_power:
+            self._wake.clear()
+        self._thread = threading.Thread(target=self._supervise, args=(self._gen,),
+                                        name="camera-grab", daemon=True)
+        self._thread.start()
+
+    def _current(self, gen):
+        return self._running and gen == self._gen
+
+    def _supervise(self, gen):
+        delay = self.reconnect_backoff[0]
+        cap = None
+        try:
+            while self._current(gen):
+                if cap is None:
+                    self._set_state("opening")
+                    cap = self._open_device(gen)
+                    if cap is None:
+                        if not self._current(gen):
+                            break
+                        self._set_state("lost")
+                        self._service_requests(None)
+                        self._halt.wait(delay)
+                        delay = min(delay * 2, self.reconnect_backoff[1])
+                        continue
+                if self._grab_loop(gen, cap):
+                    delay = self.reconnect_backoff[0]   # it was live; start the backoff over
+                if not self._current(gen):
+                    break
+                if getattr(cap, "ended", False):
+                    # a recording that does not loop: stop here, do not replay it from the top
+                    self._running = False
+                    self._set_state("ended")
+                    break
+                self._drop_device(cap)
+                cap = None
+                self._set_state("lost")
+                self._service_requests(None)
+                self._halt.wait(delay)
+                delay = min(delay * 2, self.reconnect_backoff[1])
+        finally:
+            # this thread owns the device; release() only asks it to stop
+            self._drop_device(cap)
+            self._service_requests(None)
+
+    def _publish(self, frame, now=None):
+        with self._cond:
+            if self._seq > self._read_seq:
+                self.dropped += 1   # previous frame was never read
+            self._seq += 1
+            self._ring.append((self._seq, now or time.monotonic(), frame))
+            self._cond.notify_all()
+
+    def _grab_loop(self, gen, cap):
+        """Read frames until the stream stalls; True if any frame arrived."""
+        got_any = False
+        last_ok = time.monotonic()
+        while self._current(gen) and cap.isOpened():
+            self._service_requests(cap)
+            ok, frame = cap.read()
+            now = time.monotonic()
+            if not ok:
+                if getattr(cap, "ended", False) or now - last_ok > self.lost_after:
+                    break   # unplugged or wedged: let the supervisor reopen it
+                time.sleep(0.01)
+                continue
+            last_ok = now
+            if not got_any:
+                got_any = True
+                self._set_state("live")
+            self._publish(frame, now)
+            if self.low_power:
+                self._wake.wait(1.0 / max(0.1, self.low_power_fps))
+        return got_any
+
+    # reading
+    def latest(self):
+        """Newest (seq, timestamp, bgr_frame) without blocking, or None."""
+        if not self.threaded:
+            frame = self._read_direct()
+            if frame is None:
+                return None
+            self._seq += 1
+            return self._seq, time.monotonic(), frame
+        with self._cond:
+            if not self._ring:
+                return None
+            item = self._ring[-1]
+            self._read_seq = max(self._read_seq, item[0])
+            return item
+
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than after_seq exists, then return it as
+        (seq, timestamp, bgr_frame); None on timeout. Used by FrameBus.
+        """
+        if not self.threaded:
+            return self.latest()
+        with self._cond:
+            self._cond.wait_for(lambda: self._ring and self._ring[-1][0] > after_seq, timeout)
+            if not self._ring or self._ring[-1][0] <= after_seq:
+                return None
+            item = self._ring[-1]
+            self._read_seq = max(self._read_seq, item[0])
+            return item
+
+    def _read_direct(self):
         if not self.cap or not self.cap.isOpened():
             return None
         ok, frame = self.cap.read()
-        if not ok:
-            return None
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(frame)
+        return frame if ok else None
+
+    def read_bgr_array(self):
+        """Newest frame as the camera's own H x W x 3 BGR array (no copy), or None."""
+        item = self.latest()
+        return None if item is None else item[2]
+
+    def read_rgb_array(self):
+        """Newest frame as an H x W x 3 RGB array, or None."""
+        frame = self.read_bgr_array()
+        return None if frame is None else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def read_rgb_frame(self):
+        frame = self.read_rgb_array()
+        return None if frame is None else Image.fromarray(frame)
+
+    def request_still(self, flush=5):
+        """
+        Future of one full-resolution (width x height) BGR frame, or None.
+        See request_burst(); never blocks the caller.
+        """
+        fut = Future()
+
+        def done(f):
+            if f.cancelled():
+                fut.cancel()
+            elif f.exception() is not None:
+                fut.set_exception(f.exception())
+            else:
+                fut.set_result((f.result() or [None])[0])
+
+        self.request_burst(1, flush=flush).add_done_callback(done)
+        return fut
+
+    def request_burst(self, count, interval=0.0, flush=5):
+        """
+        Future of a list of up to count full-resolution BGR frames, interval
+        seconds apart. With a low-res analysis stream the supervisor switches
+        the device up, drops the few frames still in flight at the old size,
+        takes the burst and switches back; the preview keeps running on the
+        burst frames meanwhile. Without one the burst comes from the stream.
+        """
+        count = max(1, int(count))
+        dual = self.analysis_size and tuple(self.analysis_size) != (self.width, self.height)
+
+        def burst(cap):
+            if dual:
+                self._set_size(cap, self.width, self.height)
+            try:
+                frames = []
+                if dual:
+                    last = None
+                    for _ in range(max(1, int(flush))):
+                        ok, frame = cap.read()
+                        if not ok:
+                            continue
+                        self._publish(frame)
+                        last = frame
+                        if frame.shape[:2] == (self.height, self.width):
+                            break
+                    if last is not None:
+                        frames.append(last)  # wrong size only if the device can't do it; best we got
+                next_due = time.monotonic() + (interval if frames else 0.0)
+                while len(frames) < count:
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    self._publish(frame)
+                    if time.monotonic() >= next_due:
+                        frames.append(frame)
+                        next_due += interval
+                return frames
+            finally:
+                if dual:
+                    self._set_size(cap, *self._stream_size())
+
+        return self._request(burst)
 
     def release(self):
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
-        self.cap = None
\ No newline at end of file
+        self._running = False
+        self._halt.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            # the supervisor releases the device itself; if it is stuck in
+            # VideoCapture()/read() it does so once that returns
+            self._thread.join(timeout=1.0)
+        elif not self.threaded:
+            self._drop_device(self.cap)
+        self._thread = None
+        with self._cond:
+            self._ring.clear()
+        self._set_state("closed")
@@ -0,0 +1,93 @@
+# shared/chatworker.py
+"""
+Chatbot replies off the Tk thread.
+
+ReplyWorker runs assistant.reply() on one background thread, so requests are
+answered strictly in the order they were sent. Finished replies go into a
+thread-safe queue that the Tk loop drains with results(). cancel() drops
+everything still queued and discards a reply that is in flight (e.g. when the
+chat screen is hidden). Mapped intent functions therefore also run on the
+worker thread and must not touch Tk widgets directly.
+"""
+import queue, threading, time
+from collections import deque, namedtuple
+
+Reply = namedtuple("Reply", "req_id text reply latency")
+
+
+class ReplyWorker:
+    def __init__(self, name="chat-reply", history=100):
+        self.name = name
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._gen = 0               # bumped by cancel(); older requests are stale
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.latencies = deque(maxlen=history)   # seconds, per answered reply
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, assistant, text):
+        """Queue one message for assistant.reply(); returns its request id."""
+        self.start()
+        with self._lock:
+            self._next_id += 1
+            req_id, gen = self._next_id, self._gen
+        self._requests.put((req_id, gen, assistant, text, time.perf_counter()))
+        return req_id
+
+    def results(self):
+        """Drain finished replies without blocking, oldest first."""
+        out = []
+        while True:
+            try:
+                out.append(self._results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def cancel(self):
+        """Forget queued and in-flight requests, and any undrained replies."""
+        with self._lock:
+            self._gen += 1
+        self.results()
+
+    @property
+    def mean_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def close(self):
+        self.cancel()
+        self._stop.set()
+        self._requests.put(None)   # wake the worker
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _stale(self, gen):
+        with self._lock:
+            return gen != self._gen
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._requests.get()
+            if item is None:
+                continue
+            req_id, gen, assistant, text, t_sent = item
+            if self._stale(gen):
+                continue
+            try:
+                reply = assistant.reply(text)
+            except Exception as e:
+                reply = f"(Sorry, something went wrong: {e})"
+            if self._stale(gen):
+                continue   # cancelled while we were thinking
+            latency = time.perf_counter() - t_sent   # queueing + tokenize + inference
+            self.latencies.append(latency)
+            self._results.put(Reply(req_id, text, reply, latency))
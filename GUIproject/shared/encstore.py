@@ -0,0 +1,200 @@
+# shared/encstore.py
+"""
+Append-only, memory-mapped face encodings store (replaces encodings.pickle).
+
+A store at "encodings.f32" is three files sharing the stem:
+  encodings.f32    24-byte header (magic b"FENC", uint32 version, uint32 dim,
+                   uint32 row count, uint64 byte length of .names) followed by
+                   float32 rows, one per encoding
+  encodings.names  UTF-8, one name per line; line i belongs to row i
+  encodings.tomb   little-endian uint32 row ids that have been removed
+
+append() writes the new rows and names past the committed lengths and then
+rewrites the header, so it costs O(new rows) and a crash half-way leaves the
+old store intact. tombstone() only appends to .tomb. Neither rewrites the
+gallery; training rewrites it with write() once tombstones pile up (see
+TrainingCache.sync_store). load() reads the matrix through np.memmap, never
+unpickles anything, and returns a private copy so the files can still be
+replaced while a gallery is live (Windows cannot os.replace a mapped file).
+"""
+import os
+import numpy as np
+
+MAGIC = b"FENC"
+VERSION = 2
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("dim", "<u4"), ("count", "<u4"),
+                   ("names_size", "<u8")])
+HEADER_SIZE = HEADER.itemsize  # 24
+HEADER_V1_SIZE = 16  # v1: magic, version, dim, reserved; lengths came from the file sizes
+DEFAULT_DIM = 128
+
+
+class StoreFormatError(ValueError):
+    pass
+
+
+def _stem(path):
+    return os.path.splitext(path)[0]
+
+
+def gallery_exists(path):
+    """True if path (a store or a legacy .pickle) or its legacy sibling exists."""
+    return os.path.exists(path) or os.path.exists(_stem(path) + ".pickle")
+
+
+def load_gallery(path):
+    """
+    Load (encodings, names) from a store, or from a legacy encodings.pickle.
+    A missing store falls back to "<stem>.pickle" so old installs keep working
+    until the next training run writes the new format.
+    """
+    if path.endswith(".pickle"):
+        return _load_pickle(path)
+    if not os.path.exists(path) and os.path.exists(_stem(path) + ".pickle"):
+        return _load_pickle(_stem(path) + ".pickle")
+    return EncodingStore(path).load()
+
+
+def _load_pickle(path):
+    import pickle
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    return data.get("encodings", []), data.get("names", [])
+
+
+class EncodingStore:
+    def __init__(self, path):
+        self.path = path
+        self.names_path = _stem(path) + ".names"
+        self.tomb_path = _stem(path) + ".tomb"
+
+    # header
+    def _read_header(self):
+        """(dim, count, names_size, data offset); count/names_size are None for v1."""
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_V1_SIZE or raw[:4] != MAGIC:
+            raise StoreFormatError(f"Not an encodings store: {self.path}")
+        version, dim = np.frombuffer(raw, dtype="<u4", count=2, offset=4)
+        if version == 1:
+            return int(dim), None, None, HEADER_V1_SIZE
+        if version != VERSION:
+            raise StoreFormatError(f"Unsupported encodings store version {int(version)}")
+        if len(raw) < HEADER_SIZE:
+            raise StoreFormatError(f"Truncated encodings store: {self.path}")
+        hdr = np.frombuffer(raw, dtype=HEADER)[0]
+        return int(dim), int(hdr["count"]), int(hdr["names_size"]), HEADER_SIZE
+
+    def _header_bytes(self, dim, count, names_size):
+        return np.array([(MAGIC, VERSION, dim, count, names_size)], dtype=HEADER).tobytes()
+
+    # reading
+    def size(self):
+        """Committed rows, tombstoned ones included; None if missing or not appendable (v1)."""
+        if not os.path.exists(self.path):
+            return None
+        return self._read_header()[1]
+
+    def dead_count(self):
+        return os.path.getsize(self.tomb_path) // 4 if os.path.exists(self.tomb_path) else 0
+
+    def _read_names(self, size=None):
+        if not os.path.exists(self.names_path):
+            return []
+        with open(self.names_path, "rb") as f:
+            raw = f.read(-1 if size is None else size)
+        lines = raw.decode("utf-8").split("\n")
+        return lines[:-1]  # every name is newline-terminated; drop a partial last line
+
+    def _read_tombstones(self):
+        if not os.path.exists(self.tomb_path):
+            return np.zeros(0, dtype=np.uint32)
+        return np.fromfile(self.tomb_path, dtype="<u4")
+
+    def load(self):
+        """Returns (encodings, names) for live rows; encodings is an in-memory float32 copy."""
+        if not os.path.exists(self.path):
+            return np.zeros((0, DEFAULT_DIM), dtype=np.float32), []
+        dim, count, names_size, offset = self._read_header()
+        names = self._read_names(names_size)
+        # v1 had no committed count: a crash between the two appends left one file longer
+        n = min((os.path.getsize(self.path) - offset) // (4 * dim), len(names))
+        if count is not None:
+            n = min(n, count)
+        names = names[:n]
+        if n == 0:
+            return np.zeros((0, dim), dtype=np.float32), []
+        mat = np.memmap(self.path, dtype="<f4", mode="r", offset=offset, shape=(n, dim))
+        encodings = np.array(mat, dtype=np.float32)
+        del mat  # unmapped here, not whenever the gallery is dropped
+
+        dead = self._read_tombstones()
+        dead = dead[dead < n]
+        if len(dead) == 0:
+            return encodings, names
+        live = np.ones(n, dtype=bool)
+        live[dead] = False
+        rows = np.flatnonzero(live)
+        return encodings[rows], [names[i] for i in rows]
+
+    # writing
+    def write(self, encodings, names):
+        """Replace the whole store (atomically per file)."""
+        mat = np.asarray(encodings, dtype="<f4").reshape(len(encodings), -1) if len(encodings) \
+            else np.zeros((0, DEFAULT_DIM), dtype="<f4")
+        if len(mat) != len(names):
+            raise ValueError("encodings and names must have the same length")
+        data = _names_bytes(names)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._header_bytes(mat.shape[1], len(mat), len(data)))
+            f.write(np.ascontiguousarray(mat).tobytes())
+        tmp_names = self.names_path + ".tmp"
+        with open(tmp_names, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        os.replace(tmp_names, self.names_path)
+        if os.path.exists(self.tomb_path):
+            os.remove(self.tomb_path)
+
+    def append(self, encodings, names):
+        """Append rows for new identities; returns their row ids."""
+        if not os.path.exists(self.path):
+            self.write(encodings, names)
+            return list(range(len(names)))
+        dim, count, names_size, offset = self._read_header()
+        if count is None:
+            raise StoreFormatError(f"v1 store cannot be appended to, write() it again: {self.path}")
+        mat = np.asarray(encodings, dtype="<f4").reshape(len(encodings), -1)
+        if len(mat) != len(names):
+            raise ValueError("encodings and names must have the same length")
+        if len(mat) and mat.shape[1] != dim:
+            raise ValueError(f"Expected {dim}-d encodings, got {mat.shape[1]}-d")
+        data = _names_bytes(names)
+        # write past the committed lengths, dropping any half-written tail
+        with open(self.path, "r+b") as f:
+            f.seek(offset + count * 4 * dim)
+            f.write(np.ascontiguousarray(mat).tobytes())
+            f.truncate()
+        with open(self.names_path, "r+b") as f:
+            f.seek(names_size)
+            f.write(data)
+            f.truncate()
+        # commit
+        with open(self.path, "r+b") as f:
+            f.write(self._header_bytes(dim, count + len(mat), names_size + len(data)))
+        return list(range(count, count + len(mat)))
+
+    def tombstone(self, rows):
+        if not len(rows):
+            return
+        with open(self.tomb_path, "ab") as f:
+            f.write(np.asarray(rows, dtype="<u4").tobytes())
+
+
+def _clean(name):
+    return str(name).replace("\r", " ").replace("\n", " ")
+
+
+def _names_bytes(names):
+    return "".join(_clean(n) + "\n" for n in names).encode("utf-8")
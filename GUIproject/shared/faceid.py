@@ -1,6 +1,12 @@
 # shared/faceid.py
-import os, time, pickle
+import os, time, threading
 import numpy as np
+from PIL import Image
+
+from shared.encstore import load_gallery, gallery_exists
+from shared.faceindex import build_index
+from shared.tracking import FaceTracker
+from shared.quality import QualityController
 
 try:
     import face_recognition
@@ -8,6 +14,28 @@ try:
 except Exception:
     FACE_LIB_OK = False
 
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+ENC_DIM = 128
+
+def resize_frame(frame, w, h):
+    if OPENCV_OK:
+        return cv2.resize(frame, (w, h), interpolation=cv2.INTER_LINEAR)
+    return np.asarray(Image.fromarray(frame).resize((w, h), Image.BILINEAR))
+
+def fit_width(frame, width):
+    """Resize frame to width (aspect kept); (img, fx, fy) maps img coords back to frame."""
+    h, w = frame.shape[:2]
+    if not width or w == width:
+        return frame, 1.0, 1.0
+    nh = max(1, round(h * width / w))
+    return resize_frame(frame, width, nh), w / width, h / nh
+
 class FaceIdentifier:
     """
     Wraps face_recognition to detect/identify faces on a PIL RGB image.
@@ -16,28 +44,127 @@ class FaceIdentifier:
       - names are matched names or "Unknown"
       - fps is a rolling FPS estimate for processing
     """
-    def __init__(self, encodings_path="encodings.pickle", scaler=4, model="large"):
+    def __init__(self, encodings_path="encodings.f32", scaler=None, model=None,
+                 tolerance=0.6, top_k=3, index="auto", index_opts=None,
+                 track=True, detect_every=None, analysis_width=None,
+                 adaptive=False, budget_ms=60.0, background_load=False):
+        # index: nearest-neighbour backend from shared/faceindex.py ("auto", "brute",
+        #   "centroid", "ivf"); index_opts tunes it, e.g. {"n_probe": 16}
+        # track: detect every detect_every frames and follow boxes in between
+        #   (shared/tracking.py); tracks keep the identity they were first given
+        # analysis_width: fixed recognition resolution, independent of the input size
+        # adaptive: a QualityController tunes scaler/model/detect_every to stay
+        #   under budget_ms; explicit values pick its starting level
+        # background_load: load the gallery and build its index on a loader thread
+        explicit = (scaler, model, detect_every)
+        # None means "default": 4 / "large" / 5, or the controller's pick when adaptive
+        scaler = 4 if scaler is None else scaler
+        model = "large" if model is None else model
+        detect_every = 5 if detect_every is None else detect_every
+        self.analysis_width = int(analysis_width) if analysis_width else None
         self.scaler = max(1, int(scaler))
         self.model = model
-        self.encodings = []
+        self.tolerance = float(tolerance)
+        self.top_k = max(1, int(top_k))
+        self.index_kind = index
+        self.index_opts = dict(index_opts or {})
         self.names = []
+        self._gallery_lock = threading.Lock()
+        self._gallery_gen = 0   # bumped by reload(); a slower, older load must not win
+        self._set_gallery([], [])
         self._load_ok = False
-        if FACE_LIB_OK and os.path.exists(encodings_path):
-            with open(encodings_path, "rb") as f:
-                data = pickle.load(f)
-            self.encodings = data.get("encodings", [])
-            self.names = data.get("names", [])
-            self._load_ok = True
+        self.last_matches = []
+        self.tracker = FaceTracker(detect_every=detect_every) if track else None
+        self.quality = QualityController(budget_ms=budget_ms, start=explicit) if adaptive else None
+        if self.quality is not None:
+            self._apply_quality()
+        self.stage_ms = {}
+        self._analysis_size = None
+        if FACE_LIB_OK and gallery_exists(encodings_path):
+            if background_load:
+                # empty results until the gallery and its index are ready
+                threading.Thread(target=self._load, args=(encodings_path, 0),
+                                 name="gallery-load", daemon=True).start()
+            else:
+                self._load(encodings_path, 0)
 
         self._f_count = 0
         self._start = time.time()
         self.fps = 0.0
 
+    # gallery
+    def _load(self, path, gen):
+        encodings, names = load_gallery(path)
+        if self._set_gallery(encodings, names, gen):
+            self._load_ok = True
+
+    def _set_gallery(self, encodings, names, gen=None):
+        """
+        Pack encodings into a contiguous float32 matrix and build the search
+        index. With gen given, the swap is skipped (returns False) if a newer
+        load started meanwhile.
+        """
+        if len(encodings):
+            m = np.asarray(encodings, dtype=np.float32).reshape(len(encodings), -1)
+        else:
+            m = np.zeros((0, ENC_DIM), dtype=np.float32)
+        m = np.ascontiguousarray(m)
+        names = list(names)
+        index = build_index(self.index_kind, m, names, **self.index_opts)
+        # swap as a unit: match() may be running on a recognition thread
+        with self._gallery_lock:
+            if gen is not None and gen != self._gallery_gen:
+                return False
+            self.encodings, self.names, self._index = m, names, index
+        return True
+
+    def match(self, encs, top_k=None):
+        """
+        Match a batch of encodings against the gallery (one contiguous N x 128
+        float32 matrix) in a single batched index search.
+        Returns one (name, distance, candidates) tuple per encoding, where
+        candidates is a list of up to top_k (name, distance) pairs, nearest first.
+        name is "Unknown" when the best distance is above self.tolerance.
+        """
+        k = self.top_k if top_k is None else max(1, int(top_k))
+        if len(encs) == 0:
+            return []
+        with self._gallery_lock:
+            gallery, names, index = self.encodings, self.names, self._index
+        n = len(gallery)
+        if n == 0:
+            return [("Unknown", float("inf"), []) for _ in encs]
+
+        q = np.asarray(encs, dtype=np.float32).reshape(len(encs), -1)
+        idx, d2 = index.search(q, min(k, n))
+        dists = np.sqrt(d2)
+
+        results = []
+        for row_idx, row_d in zip(idx, dists):
+            cands = [(names[int(j)], float(d)) for j, d in zip(row_idx, row_d) if j >= 0]
+            if not cands:
+                results.append(("Unknown", float("inf"), []))
+                continue
+            best_name, best_d = cands[0]
+            if best_d > self.tolerance:
+                best_name = "Unknown"
+            results.append((best_name, best_d, cands))
+        return results
+
     def annotate_pil(self, pil_rgb):
         """
         Run detection+recognition on a PIL.Image in RGB mode.
         Returns (upscaled_boxes, names, fps).
         If face_recognition not available or encodings missing, returns ([], [], fps).
+        Per-face match details (distance, top-k candidates) are kept in self.last_matches.
+        """
+        frame = np.asarray(pil_rgb) if pil_rgb else None  # H x W x 3, RGB
+        return self.annotate_array(frame)
+
+    def annotate_array(self, frame, bgr=False):
+        """
+        Same as annotate_pil for an H x W x 3 uint8 array: RGB, or BGR straight
+        from the camera with bgr=True (converted after downscaling, which is cheaper).
         """
         # FPS bookkeeping
         self._f_count += 1
@@ -47,53 +174,106 @@ class FaceIdentifier:
             self._f_count = 0
             self._start = time.time()
 
-        if not (FACE_LIB_OK and self._load_ok and pil_rgb):
+        if not (FACE_LIB_OK and self._load_ok and frame is not None):
+            self.last_matches = []
             return [], [], self.fps
 
-        # Convert PIL->np RGB
-        frame_rgb = np.array(pil_rgb)  # H x W x 3, RGB
+        t0 = time.perf_counter()
+        self.stage_ms = {"prep": 0.0, "detect": 0.0, "encode": 0.0, "match": 0.0}
+
+        # Resize to the fixed analysis resolution (if set)
+        img, fx, fy = fit_width(frame, self.analysis_width)
+        if bgr:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if OPENCV_OK else np.ascontiguousarray(img[:, :, ::-1])
+        self._analysis_size = (img.shape[1], img.shape[0])
         # Downscale for speed
-        small = frame_rgb[::self.scaler, ::self.scaler, :]
+        small = img[::self.scaler, ::self.scaler, :]
+        if not small.flags.writeable:
+            small = small.copy()  # shared read-only bus frame; dlib wants its own buffer
+        self.stage_ms["prep"] = (time.perf_counter() - t0) * 1000.0
 
-        boxes = face_recognition.face_locations(small)
-        encs = face_recognition.face_encodings(small, boxes, model=self.model)
+        if self.tracker is not None:
+            tracks = self.tracker.step(small, self._detect, self._identify)
+            boxes = [tr.box for tr in tracks]
+            self.last_matches = [tr.match for tr in tracks]
+            names = [tr.name for tr in tracks]
+        else:
+            boxes = self._detect(small)
+            self.last_matches = self._identify(small, boxes)
+            names = [m[0] for m in self.last_matches]
 
-        names = []
-        for e in encs:
-            if not self.encodings:
-                names.append("Unknown")
-                continue
-            matches = face_recognition.compare_faces(self.encodings, e)
-            dists = face_recognition.face_distance(self.encodings, e)
-            best = int(np.argmin(dists)) if len(dists) else -1
-            if best >= 0 and matches[best]:
-                names.append(self.names[best])
-            else:
-                names.append("Unknown")
+        # Map box coords back to the input image
+        sx, sy = self.scaler * fx, self.scaler * fy
+        up_boxes = [(int(t*sy), int(r*sx), int(b*sy), int(l*sx)) for (t, r, b, l) in boxes]
 
-        # Upscale box coords back to original size
-        scale = self.scaler
-        up_boxes = [(t*scale, r*scale, b*scale, l*scale) for (t, r, b, l) in boxes]
+        total_ms = (time.perf_counter() - t0) * 1000.0
+        if self.quality is not None and self.quality.record(total_ms, self.stage_ms):
+            self._apply_quality()
         return up_boxes, names, self.fps
 
+    def _detect(self, small_rgb):
+        t0 = time.perf_counter()
+        boxes = face_recognition.face_locations(small_rgb)
+        self._add_stage("detect", t0)
+        return boxes
+
+    def _identify(self, small_rgb, boxes):
+        t0 = time.perf_counter()
+        encs = face_recognition.face_encodings(small_rgb, boxes, model=self.model)
+        self._add_stage("encode", t0)
+        t0 = time.perf_counter()
+        matches = self.match(encs)
+        self._add_stage("match", t0)
+        return matches
+
+    def _add_stage(self, stage, t0):
+        self.stage_ms[stage] = self.stage_ms.get(stage, 0.0) + (time.perf_counter() - t0) * 1000.0
+
+    # adaptive quality
+    def _apply_quality(self):
+        cur = self.quality.current
+        if cur["scaler"] != self.scaler:
+            self.scaler = cur["scaler"]
+            self.reset_tracking()  # track boxes are in the old downscaled space
+        self.model = cur["model"]
+        if self.tracker is not None:
+            self.tracker.detect_every = cur["detect_every"]
+
+    def settings(self):
+        """Current recognition settings (and controller state when adaptive)."""
+        out = {"analysis_size": self._analysis_size, "scaler": self.scaler, "model": self.model,
+               "detect_every": self.tracker.detect_every if self.tracker is not None else 1,
+               "stage_ms": dict(self.stage_ms)}
+        if self.quality is not None:
+            q = self.quality.report()
+            out.update(level=q["level"], budget_ms=q["budget_ms"], ema_ms=q["ema_ms"])
+        return out
+
+    def reset_tracking(self):
+        """Forget all tracks (e.g. after a pause in the video)."""
+        if self.tracker is not None:
+            self.tracker.reset()
+
     def reload(self, encodings_path=None):
-        """Reload encodings from disk."""
-        import pickle, os
+        """
+        Reload encodings from disk. Loading and index building happen on the
+        calling thread (keep it off the Tk thread); the swap itself is atomic.
+        """
         if encodings_path:
             # allow override
             self_path = encodings_path
         else:
             # try the same path used at init by looking at project root
             # (adjust if you stored path elsewhere)
-            import inspect, os
+            import inspect
             project_root = os.path.dirname(os.path.dirname(inspect.getfile(type(self))))
-            self_path = os.path.join(project_root, "encodings.pickle")
-        if os.path.exists(self_path):
-            with open(self_path, "rb") as f:
-                data = pickle.load(f)
-            self.encodings = data.get("encodings", [])
-            self.names = data.get("names", [])
-            self._load_ok = True
-        else:
-            self.encodings, self.names = [], []
-            self._load_ok = False
\ No newline at end of file
+            self_path = os.path.join(project_root, "encodings.f32")
+        with self._gallery_lock:
+            self._gallery_gen += 1
+            gen = self._gallery_gen
+        if gallery_exists(self_path):
+            self._load(self_path, gen)
+        elif self._set_gallery([], [], gen):
+            self._load_ok = False
+        # cached identities may refer to the old gallery
+        self.reset_tracking()
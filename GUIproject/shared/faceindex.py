@@ -0,0 +1,197 @@
+# shared/faceindex.py
+"""
+Nearest-neighbour index backends for FaceIdentifier.
+
+Every backend answers search(queries, k) -> (idx, d2):
+  - idx: (Q, k) int array of gallery rows, nearest first, -1 where fewer than k were found
+  - d2:  (Q, k) float32 squared euclidean distances, inf where idx == -1
+
+  "brute"    exact scan over the whole gallery
+  "centroid" one list per identity; probe the n_probe identities whose centroid
+             is closest, then refine exactly over their encodings
+  "ivf"      k-means coarse quantizer with ~sqrt(N) lists; probe n_probe lists
+             and refine exactly over their members
+  "auto"     brute for small galleries, ivf once the gallery reaches auto_threshold
+
+n_probe is the recall/latency knob: higher probes more lists (better recall,
+more work), n_probe >= number of lists is equivalent to brute force.
+"""
+import numpy as np
+
+AUTO_THRESHOLD = 4096
+
+
+def _sq_norms(m):
+    return np.einsum("ij,ij->i", m, m)
+
+
+def _topk(d2, k):
+    """Row-wise k smallest of a (Q, N) distance matrix, sorted ascending."""
+    q, n = d2.shape
+    k = min(k, n)
+    if k == 0:
+        return np.zeros((q, 0), dtype=np.int64), np.zeros((q, 0), dtype=np.float32)
+    if k < n:
+        idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(n), (q, n))
+    part = np.take_along_axis(d2, idx, axis=1)
+    order = np.argsort(part, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def _pad(idx, d2, k):
+    """Pad (Q, k') results to (Q, k) with -1 / inf."""
+    q, have = idx.shape
+    if have >= k:
+        return idx, d2
+    out_i = np.full((q, k), -1, dtype=np.int64)
+    out_d = np.full((q, k), np.inf, dtype=np.float32)
+    out_i[:, :have] = idx
+    out_d[:, :have] = d2
+    return out_i, out_d
+
+
+def _group_means(x, assign, k):
+    """Mean row per group; (means, counts). Empty groups get a zero row."""
+    counts = np.bincount(assign, minlength=k)
+    means = np.zeros((k, x.shape[1]), dtype=np.float32)
+    filled = np.flatnonzero(counts)
+    if len(filled):
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+        sums = np.add.reduceat(x[order].astype(np.float64), starts, axis=0)
+        means[filled] = sums / counts[filled, None]
+    return means, counts
+
+
+def pairwise_sq_dists(q, m, m_sq=None):
+    """Squared distances between rows of q (Q x D) and m (N x D)."""
+    if m_sq is None:
+        m_sq = _sq_norms(m)
+    d2 = _sq_norms(q)[:, None] + m_sq[None, :] - 2.0 * (q @ m.T)
+    np.maximum(d2, 0.0, out=d2)
+    return d2
+
+
+class BruteForceIndex:
+    """Exact scan; the reference every other backend is measured against."""
+    kind = "brute"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.sq_norms = _sq_norms(matrix)
+
+    def search(self, q, k):
+        d2 = pairwise_sq_dists(q, self.matrix, self.sq_norms)
+        idx, d2 = _topk(d2, k)
+        return _pad(idx, d2, k)
+
+
+class _ListIndex:
+    """
+    Shared machinery for inverted-list backends.
+    The gallery is reordered so every list is one contiguous slice, which keeps
+    the refine step a handful of dense matmuls instead of fancy-indexed copies.
+    """
+    kind = "lists"
+
+    def __init__(self, matrix, assign, centroids, n_probe):
+        self.n_probe = max(1, int(n_probe))
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq = _sq_norms(self.centroids)
+
+        order = np.argsort(assign, kind="stable")
+        self.perm = order                                   # reordered row -> gallery row
+        self.matrix = np.ascontiguousarray(matrix[order])
+        self.sq_norms = _sq_norms(self.matrix)
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def search(self, q, k):
+        probe = min(self.n_probe, self.n_lists)
+        coarse = pairwise_sq_dists(q, self.centroids, self.centroid_sq)
+        lists, _ = _topk(coarse, probe)
+
+        out_i = np.full((len(q), k), -1, dtype=np.int64)
+        out_d = np.full((len(q), k), np.inf, dtype=np.float32)
+        for qi in range(len(q)):
+            rows, dists = [], []
+            for l in lists[qi]:
+                a, b = self.offsets[l], self.offsets[l + 1]
+                if a == b:
+                    continue
+                dists.append(pairwise_sq_dists(q[qi:qi + 1], self.matrix[a:b], self.sq_norms[a:b])[0])
+                rows.append(np.arange(a, b))
+            if not rows:
+                continue
+            rows = np.concatenate(rows)
+            dists = np.concatenate(dists)[None, :]
+            top, d2 = _topk(dists, k)
+            n = top.shape[1]
+            out_i[qi, :n] = self.perm[rows[top[0]]]
+            out_d[qi, :n] = d2[0]
+        return out_i, out_d
+
+
+class CentroidIndex(_ListIndex):
+    """One list per identity, keyed by the mean encoding of that identity."""
+    kind = "centroid"
+
+    def __init__(self, matrix, names, n_probe=8):
+        labels, assign = np.unique(np.asarray(names, dtype=object).astype(str), return_inverse=True)
+        centroids, _ = _group_means(matrix, assign, len(labels))
+        super().__init__(matrix, assign, centroids, n_probe)
+
+
+class IVFIndex(_ListIndex):
+    """k-means coarse quantizer (inverted file) over all encodings."""
+    kind = "ivf"
+
+    def __init__(self, matrix, n_lists=None, n_probe=8, iters=10, seed=0):
+        n = len(matrix)
+        if n_lists is None:
+            n_lists = int(np.sqrt(n))
+        n_lists = int(min(max(1, n_lists), n))
+        centroids, assign = kmeans(matrix, n_lists, iters=iters, seed=seed)
+        super().__init__(matrix, assign, centroids, n_probe)
+
+
+def kmeans(x, k, iters=10, seed=0, chunk=8192):
+    """Plain Lloyd's k-means; returns (centroids, assignment)."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].astype(np.float32)
+    assign = np.zeros(len(x), dtype=np.int64)
+    x_sq = _sq_norms(x)
+    for _ in range(max(1, int(iters))):
+        c_sq = _sq_norms(centroids)
+        for s in range(0, len(x), chunk):
+            d2 = x_sq[s:s + chunk, None] + c_sq[None, :] - 2.0 * (x[s:s + chunk] @ centroids.T)
+            assign[s:s + chunk] = np.argmin(d2, axis=1)
+        means, counts = _group_means(x, assign, k)
+        # empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = means[filled]
+    return centroids, assign
+
+
+def build_index(kind, matrix, names, **opts):
+    """Build the index backend named by kind ("brute", "centroid", "ivf", "auto")."""
+    kind = (kind or "brute").lower()
+    if kind == "auto":
+        threshold = opts.pop("auto_threshold", AUTO_THRESHOLD)
+        kind = "ivf" if len(matrix) >= threshold else "brute"
+    else:
+        opts.pop("auto_threshold", None)
+    if len(matrix) == 0 or kind == "brute":
+        return BruteForceIndex(matrix)
+    if kind == "centroid":
+        return CentroidIndex(matrix, names, n_probe=opts.get("n_probe", 8))
+    if kind == "ivf":
+        return IVFIndex(matrix, n_lists=opts.get("n_lists"), n_probe=opts.get("n_probe", 8),
+                        iters=opts.get("iters", 10), seed=opts.get("seed", 0))
+    raise ValueError(f"Unknown face index kind: {kind}")
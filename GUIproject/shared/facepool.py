@@ -0,0 +1,221 @@
+# shared/facepool.py
+"""
+Multi-core recognition engine.
+
+PooledFaceIdentifier has the same annotate_pil(pil_rgb) -> (boxes, names, fps)
+contract as FaceIdentifier, but fans detection + encoding out to a process
+pool. Frames travel through a small ring of shared-memory slots (only the slot
+name and frame shape are pickled), and results are handed back strictly in
+frame-sequence order. annotate_pil never waits for the pool: it submits the
+frame if a slot is free and returns the newest in-order result, so results lag
+the submitted frame by up to `slots` frames.
+With analysis_width set, frames are resized to that width on the caller side
+before they are copied into shared memory.
+Workers are spawned (not forked from the threaded Tk process), and reload()/
+close() never wait for them: queued work is cancelled and the old processes
+exit on their own once their current frame is done.
+There is no adaptive quality here: the workers' scaler/model are fixed when
+the pool starts, and extra cores, not a cheaper level, absorb the load.
+"""
+import os, time, threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from shared.encstore import gallery_exists
+from shared.faceid import FaceIdentifier, FACE_LIB_OK, OPENCV_OK, cv2, fit_width
+
+# --- worker process side ---
+_WORKER = None
+_SHM = {}
+
+
+def _init_worker(kwargs):
+    global _WORKER
+    _WORKER = FaceIdentifier(track=False, **kwargs)
+
+
+def _attach(name):
+    shm = _SHM.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _SHM[name] = shm
+    return shm
+
+
+def _recognize_slot(seq, shm_name, shape):
+    shm = _attach(shm_name)
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    small = frame[::_WORKER.scaler, ::_WORKER.scaler, :]
+    boxes = _WORKER._detect(small)
+    names = [m[0] for m in _WORKER._identify(small, boxes)]
+    s = _WORKER.scaler
+    return seq, [(t*s, r*s, b*s, l*s) for (t, r, b, l) in boxes], names
+
+
+# --- UI / caller side ---
+class PooledFaceIdentifier:
+    """
+    Drop-in replacement for FaceIdentifier that recognises on `workers`
+    processes. Call close() when done to stop the pool and free shared memory.
+    """
+    def __init__(self, encodings_path="encodings.f32", scaler=4, model="large",
+                 tolerance=0.6, index="auto", index_opts=None, workers=None, slots=None,
+                 analysis_width=None):
+        self.encodings_path = encodings_path
+        self.analysis_width = int(analysis_width) if analysis_width else None
+        self._kwargs = dict(encodings_path=encodings_path, scaler=scaler, model=model,
+                            tolerance=tolerance, index=index, index_opts=index_opts)
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.n_slots = slots or self.workers + 1
+        self._load_ok = FACE_LIB_OK and gallery_exists(encodings_path)
+
+        self._pool = None
+        self._shms = []           # SharedMemory per slot
+        self._free = []           # free slot indices
+        self._shape = None
+        self._inflight = {}       # seq -> (future, slot, fx, fy)
+        self._done = {}           # seq -> (boxes, names), waiting for earlier seqs
+        self._next_seq = 0
+        self._next_deliver = 0
+        self._last = ([], [])
+        self._lock = threading.Lock()   # annotate_pil (worker thread) vs reload (UI thread)
+
+        self._f_count = 0
+        self._start = time.time()
+        self.fps = 0.0
+
+    # pool + slots
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker,
+                                             initargs=(self._kwargs,))
+
+    def _ensure_slots(self, shape):
+        if self._shape == shape:
+            return True
+        if self._inflight:
+            return False  # frame size changed; wait for in-flight work to drain
+        self._free_slots()
+        size = int(np.prod(shape))
+        self._shms = [shared_memory.SharedMemory(create=True, size=size) for _ in range(self.n_slots)]
+        self._free = list(range(self.n_slots))
+        self._shape = shape
+        return True
+
+    def _free_slots(self):
+        for shm in self._shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+        self._shms, self._free, self._shape = [], [], None
+
+    # results
+    def _collect(self):
+        for seq, (fut, slot, fx, fy) in list(self._inflight.items()):
+            if not fut.done():
+                continue
+            del self._inflight[seq]
+            self._free.append(slot)
+            try:
+                _, boxes, names = fut.result()
+                boxes = [(int(t*fy), int(r*fx), int(b*fy), int(l*fx)) for (t, r, b, l) in boxes]
+            except Exception:
+                boxes, names = [], []
+            self._done[seq] = (boxes, names)
+        # deliver strictly in sequence order
+        while self._next_deliver in self._done:
+            self._last = self._done.pop(self._next_deliver)
+            self._next_deliver += 1
+            self._tick_fps()
+
+    def _tick_fps(self):
+        self._f_count += 1
+        elapsed = time.time() - self._start
+        if elapsed >= 1.0:
+            self.fps = self._f_count / elapsed
+            self._f_count = 0
+            self._start = time.time()
+
+    # public API (same as FaceIdentifier)
+    def annotate_pil(self, pil_rgb):
+        """
+        Submit a PIL RGB frame (if a slot is free) and return the newest
+        in-order result as (boxes, names, fps).
+        """
+        frame = np.asarray(pil_rgb, dtype=np.uint8) if pil_rgb else None
+        return self.annotate_array(frame)
+
+    def annotate_array(self, frame, bgr=False):
+        """Same as annotate_pil for an RGB (or, with bgr=True, BGR) uint8 array."""
+        if not (self._load_ok and frame is not None):
+            return [], [], self.fps
+        with self._lock:
+            return self._annotate(frame, bgr)
+
+    def _annotate(self, frame, bgr):
+        self._collect()
+
+        img, fx, fy = fit_width(frame, self.analysis_width)
+        if self._ensure_slots(img.shape) and self._free:
+            self._ensure_pool()
+            slot = self._free.pop()
+            dst = np.ndarray(img.shape, dtype=np.uint8, buffer=self._shms[slot].buf)
+            # colour conversion writes straight into shared memory
+            if bgr and OPENCV_OK:
+                cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=dst)
+            else:
+                dst[:] = img[:, :, ::-1] if bgr else img
+            seq = self._next_seq
+            self._next_seq += 1
+            fut = self._pool.submit(_recognize_slot, seq, self._shms[slot].name, img.shape)
+            self._inflight[seq] = (fut, slot, fx, fy)
+
+        boxes, names = self._last
+        return boxes, names, self.fps
+
+    def poll(self):
+        """
+        Collect finished work without submitting a frame (e.g. the motion gate
+        skipped it). (boxes, names, fps) if a newer result arrived, else None.
+        """
+        with self._lock:
+            before = self._next_deliver
+            self._collect()
+            if self._next_deliver == before:
+                return None
+            boxes, names = self._last
+            return boxes, names, self.fps
+
+    def reset_tracking(self):
+        # stateless per frame; nothing to forget
+        pass
+
+    def reload(self, encodings_path=None):
+        """Restart the pool so every worker loads the new gallery."""
+        if encodings_path:
+            self.encodings_path = encodings_path
+            self._kwargs["encodings_path"] = encodings_path
+        with self._lock:
+            self._shutdown()
+        self._load_ok = FACE_LIB_OK and gallery_exists(self.encodings_path)
+
+    def close(self):
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            # called from the Tk thread: never block on a worker mid-frame
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._inflight.clear()
+        self._done.clear()
+        self._next_deliver = self._next_seq
+        self._last = ([], [])
+        self._free_slots()
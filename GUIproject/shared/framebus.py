@@ -0,0 +1,117 @@
+# shared/framebus.py
+"""
+Publish/subscribe frame broker on top of CameraManager.
+
+One pump thread takes each new camera frame, converts it BGR->RGB once, marks
+it read-only and hands the same array to every subscriber as
+(seq, timestamp, rgb_frame). Subscribers pick their own rate:
+  every=1   every published frame is eligible
+  every=N   only every Nth published frame
+and how many to keep: maxlen=1 is latest-only (older unread frames are
+replaced), larger values queue frames in order.
+"""
+import threading
+from collections import deque
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+
+class Subscription:
+    def __init__(self, bus, every=1, maxlen=1, name=None):
+        self.bus = bus
+        self.every = max(1, int(every))
+        self.name = name
+        self._q = deque(maxlen=max(1, int(maxlen)))
+        self._cond = threading.Condition()
+        self._count = 0
+        self.dropped = 0
+        self.last_seq = 0
+
+    def _offer(self, item):
+        self._count += 1
+        if (self._count - 1) % self.every:
+            return
+        with self._cond:
+            if len(self._q) == self._q.maxlen:
+                self.dropped += 1
+            self._q.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=0):
+        """
+        Next (seq, timestamp, rgb_frame) for this subscriber, or None if there is
+        nothing new. timeout=0 never blocks (Tk loops); None waits forever.
+        """
+        with self._cond:
+            if not self._q and timeout != 0:
+                self._cond.wait(timeout)
+            if not self._q:
+                return None
+            item = self._q.popleft()
+            self.last_seq = item[0]
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._q.clear()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class FrameBus:
+    def __init__(self, camera):
+        self.camera = camera
+        self._subs = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.published = 0
+        self.last_seq = 0
+
+    def subscribe(self, every=1, maxlen=1, name=None):
+        sub = Subscription(self, every=every, maxlen=maxlen, name=name)
+        with self._lock:
+            self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, name="frame-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _pump(self):
+        while self._running:
+            item = self.camera.wait_frame(self.last_seq, timeout=0.2)
+            if item is None:
+                continue
+            seq, ts, bgr = item
+            self.last_seq = seq
+            with self._lock:
+                subs = list(self._subs)
+            if not subs:
+                continue  # nobody listening; skip the conversion
+            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB) if OPENCV_OK else bgr[:, :, ::-1].copy()
+            rgb.flags.writeable = False  # shared by every subscriber
+            self.published += 1
+            shared = (seq, ts, rgb)
+            for sub in subs:
+                sub._offer(shared)
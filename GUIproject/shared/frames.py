@@ -0,0 +1,65 @@
+# shared/frames.py
+"""
+NumPy-native preview helpers.
+
+Letterboxer fits camera frames into a fixed-size canvas with coloured bars.
+The canvas and the intermediate resize buffer are allocated once per
+(source size, target size) and reused every frame: the frame is resized into
+the scratch buffer with cv2.resize(dst=...) and colour-converted straight into
+the canvas region with cv2.cvtColor(dst=...), so a tick allocates nothing
+until the caller converts the canvas for Tk.
+"""
+import numpy as np
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+CYAN_RGB = (112, 226, 255)
+
+
+class Letterboxer:
+    def __init__(self, bg=CYAN_RGB):
+        self.bg = tuple(bg)
+        self._key = None
+        self._canvas = None
+        self._scratch = None
+        self.geometry = None   # (x, y, nw, nh, scale) of the picture inside the canvas
+
+    def _prepare(self, src_w, src_h, w, h):
+        key = (src_w, src_h, w, h)
+        if key == self._key:
+            return
+        scale = min(w / src_w, h / src_h)
+        nw, nh = max(1, int(src_w * scale)), max(1, int(src_h * scale))
+        x, y = (w - nw) // 2, (h - nh) // 2
+        self._canvas = np.empty((h, w, 3), dtype=np.uint8)
+        self._canvas[:] = self.bg
+        self._scratch = np.empty((nh, nw, 3), dtype=np.uint8)
+        self.geometry = (x, y, nw, nh, scale)
+        self._key = key
+
+    def fit(self, frame, w, h, bgr=True):
+        """
+        Letterbox an H x W x 3 uint8 frame into a (h, w) RGB canvas.
+        Returns (canvas, geometry). The canvas is reused by the next call, so
+        convert or copy it before fitting another frame.
+        """
+        src_h, src_w = frame.shape[:2]
+        self._prepare(src_w, src_h, w, h)
+        x, y, nw, nh, _ = self.geometry
+        roi = self._canvas[y:y + nh, x:x + nw]
+        if OPENCV_OK:
+            if bgr:
+                cv2.resize(frame, (nw, nh), dst=self._scratch, interpolation=cv2.INTER_LINEAR)
+                cv2.cvtColor(self._scratch, cv2.COLOR_BGR2RGB, dst=roi)
+            else:
+                cv2.resize(frame, (nw, nh), dst=roi, interpolation=cv2.INTER_LINEAR)
+        else:
+            from PIL import Image
+            src = frame[:, :, ::-1] if bgr else frame
+            roi[:] = np.asarray(Image.fromarray(np.ascontiguousarray(src)).resize((nw, nh)))
+        return self._canvas, self.geometry
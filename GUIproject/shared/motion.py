@@ -0,0 +1,69 @@
+# shared/motion.py
+"""
+Cheap change detection used to skip face recognition on static frames.
+
+Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+thumbnail of the last frame that was let through. A frame counts as changed
+when more than `area_threshold` (fraction of thumbnail pixels) differ by more
+than `pixel_threshold` grey levels. Every `max_skip` frames one frame is let
+through regardless, so results never go stale for long.
+"""
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+
+def thumbnail(frame, size=(64, 36)):
+    """Tiny grayscale int16 thumbnail of a PIL image or H x W x 3 uint8 array."""
+    if not isinstance(frame, Image.Image):
+        if OPENCV_OK:
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+        frame = Image.fromarray(np.asarray(frame))
+    return np.asarray(frame.resize(size, Image.BOX, reducing_gap=2.0).convert("L"), dtype=np.int16)
+
+
+class MotionGate:
+    def __init__(self, thumb_size=(64, 36), pixel_threshold=18, area_threshold=0.01, max_skip=60):
+        self.thumb_size = tuple(thumb_size)
+        self.pixel_threshold = int(pixel_threshold)
+        self.area_threshold = float(area_threshold)
+        self.max_skip = max(1, int(max_skip))
+
+        self._ref = None
+        self._since_pass = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.last_change = 0.0   # changed-pixel fraction of the last checked frame
+
+    def reset(self):
+        self._ref = None
+        self._since_pass = 0
+
+    def changed(self, frame):
+        """True if frame should be processed, False if it can be skipped."""
+        self.frames_checked += 1
+        thumb = thumbnail(frame, self.thumb_size)
+        if self._ref is None or self._ref.shape != thumb.shape:
+            self.last_change = 1.0
+            return self._let_through(thumb)
+
+        diff = np.abs(thumb - self._ref) > self.pixel_threshold
+        self.last_change = float(diff.mean())
+        if self.last_change > self.area_threshold or self._since_pass + 1 >= self.max_skip:
+            return self._let_through(thumb)
+
+        self._since_pass += 1
+        self.frames_skipped += 1
+        return False
+
+    def _let_through(self, thumb):
+        self._ref = thumb
+        self._since_pass = 0
+        return True
@@ -0,0 +1,191 @@
+# shared/npmodel.py
+"""
+Torch-free inference for ChatbotModel (Linear-ReLU-Linear-ReLU-Linear).
+
+load_pth() reads the weights straight out of chatbot_model.pth (a zip of a
+pickled state_dict plus raw storages) with an allow-listed unpickler, so not
+even the first run needs torch; export_npz() caches them as an .npz next to
+it, and the kiosk runs the forward pass in NumPy. Dropout is a no-op at inference, so only the three Linear layers are
+kept. With int8=True each weight row is stored as int8 with its own float32
+scale (symmetric per-output-channel quantization), about 4x smaller on disk;
+it is dequantized once at load, so inference is the same float32 matmul.
+The exported .npz files are build artefacts (ignored by git).
+
+Export and compare against torch on the intents.json patterns:
+    python -m shared.npmodel [chatbot_model.pth] [--int8]
+"""
+import os, pickle, zipfile
+from collections import OrderedDict
+import numpy as np
+
+LAYERS = ("fc1", "fc2", "fc3")
+
+_STORAGE_DTYPES = {
+    "FloatStorage": np.float32, "DoubleStorage": np.float64, "HalfStorage": np.float16,
+    "LongStorage": np.int64, "IntStorage": np.int32, "ShortStorage": np.int16,
+    "CharStorage": np.int8, "ByteStorage": np.uint8, "BoolStorage": np.bool_,
+}
+
+
+def _rebuild_tensor(storage, offset, size, stride, *_):
+    if not size:
+        return storage[offset:offset + 1].reshape(()).copy()
+    item = storage.itemsize
+    view = np.lib.stride_tricks.as_strided(storage[offset:], shape=tuple(size),
+                                           strides=tuple(st * item for st in stride))
+    return np.array(view)
+
+
+class _PthUnpickler(pickle.Unpickler):
+    # only what a plain state_dict of tensors needs; anything else is refused
+    def __init__(self, fh, zf, prefix, byteorder):
+        super().__init__(fh)
+        self._zf, self._prefix, self._byteorder = zf, prefix, byteorder
+
+    def find_class(self, module, name):
+        if (module, name) == ("collections", "OrderedDict"):
+            return OrderedDict
+        if module == "torch._utils" and name == "_rebuild_tensor_v2":
+            return _rebuild_tensor
+        if module == "torch" and name in _STORAGE_DTYPES:
+            return name
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a weights file")
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel)
+        _, storage_type, key, _, numel = pid
+        dtype = np.dtype(_STORAGE_DTYPES[storage_type]).newbyteorder(
+            "<" if self._byteorder == "little" else ">")
+        raw = self._zf.read(f"{self._prefix}data/{key}")
+        return np.frombuffer(raw, dtype=dtype, count=numel).astype(dtype.newbyteorder("="))
+
+
+def load_pth(path):
+    """state_dict of a torch.save()d zip checkpoint as {name: ndarray}, without torch."""
+    with zipfile.ZipFile(path) as zf:
+        names = zf.namelist()
+        pkl = next(n for n in names if n.endswith("data.pkl"))
+        prefix = pkl[:-len("data.pkl")]
+        byteorder = "little"
+        if prefix + "byteorder" in names:
+            byteorder = zf.read(prefix + "byteorder").decode().strip() or "little"
+        with zf.open(pkl) as fh:
+            return _PthUnpickler(fh, zf, prefix, byteorder).load()
+
+
+def state_to_arrays(state):
+    """{'fc1.weight': tensor, ...} (torch state_dict) -> {'fc1.weight': ndarray, ...}."""
+    out = {}
+    for layer in LAYERS:
+        for part in ("weight", "bias"):
+            v = state[f"{layer}.{part}"]
+            v = v.detach().cpu().numpy() if hasattr(v, "detach") else np.asarray(v)
+            out[f"{layer}.{part}"] = np.ascontiguousarray(v, dtype=np.float32)
+    return out
+
+
+def _quantize(w):
+    scale = np.abs(w).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.round(w / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def export_npz(state, path, int8=False):
+    """Write torch/ndarray weights to path (.npz); written atomically."""
+    arrays = state_to_arrays(state)
+    out = {"int8": np.array(bool(int8))}
+    for layer in LAYERS:
+        w = arrays[f"{layer}.weight"]
+        if int8:
+            out[f"{layer}.weight"], out[f"{layer}.scale"] = _quantize(w)
+        else:
+            out[f"{layer}.weight"] = w
+        out[f"{layer}.bias"] = arrays[f"{layer}.bias"]
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **out)
+    os.replace(tmp, path)
+
+
+class NumpyChatModel:
+    def __init__(self, layers, int8=False):
+        # layers: [(weight (in, out) float32, bias (out,) float32)]
+        self.layers = layers
+        self.input_size = layers[0][0].shape[0]
+        self.output_size = layers[-1][0].shape[1]
+        self.int8 = int8   # loaded from int8 weights
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            int8 = bool(z["int8"]) if "int8" in z.files else False
+            layers = []
+            for layer in LAYERS:
+                w = z[f"{layer}.weight"].astype(np.float32)
+                if int8:
+                    w *= z[f"{layer}.scale"][:, None]
+                # transposed once so forward() is x @ w
+                layers.append((np.ascontiguousarray(w.T), z[f"{layer}.bias"].astype(np.float32)))
+        return cls(layers, int8)
+
+    def __call__(self, x):
+        """(N, input_size) float32 -> (N, output_size) logits."""
+        x = np.asarray(x, dtype=np.float32)
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            x = x @ w
+            x += b
+            if i != last:
+                np.maximum(x, 0, out=x)
+        return x
+
+
+def npz_path_for(model_path, int8=False):
+    stem = os.path.splitext(model_path)[0]
+    return stem + (".int8.npz" if int8 else ".npz")
+
+
+def is_fresh(npz_path, model_path):
+    """True if the .npz exists and is not older than the .pth it came from."""
+    if not os.path.exists(npz_path):
+        return False
+    if not os.path.exists(model_path):
+        return True
+    return os.path.getmtime(npz_path) >= os.path.getmtime(model_path)
+
+
+def _compare(model_path, int8):
+    import json
+    from shared.bot import ChatbotAssistant
+
+    base = os.path.dirname(os.path.abspath(model_path))
+    intents_path = os.path.join(base, "intents.json")
+    ref = ChatbotAssistant(intents_path, model_path, os.path.join(base, "dimensions.json"),
+                           backend="torch")
+    if not ref._loaded_ok:
+        print(f"could not load {model_path} with torch")
+        return
+    npz = npz_path_for(model_path, int8)
+    export_npz(ref.model.state_dict(), npz, int8=int8)
+    fast = NumpyChatModel.load(npz)
+
+    with open(intents_path, "r", encoding="utf-8") as f:
+        intents = json.load(f).get("intents", [])
+    pairs = [(p, it["tag"]) for it in intents if it.get("tag") for p in it.get("patterns", [])]
+    if not pairs:
+        print("no patterns in intents.json")
+        return
+    x = ref._featurize([p for p, _ in pairs])
+    labels = np.array([ref.intents.index(tag) for _, tag in pairs])
+    want, got = ref._logits(x), fast(x)
+    print(f"{npz}: {os.path.getsize(npz)} bytes, int8={int8}")
+    print(f"{len(pairs)} patterns: argmax agreement {(want.argmax(1) == got.argmax(1)).mean():.1%}, "
+          f"max |logit diff| {float(np.abs(want - got).max()):.5f}")
+    print(f"accuracy vs intent tags: torch {(want.argmax(1) == labels).mean():.1%}, "
+          f"numpy {(got.argmax(1) == labels).mean():.1%}")
+
+
+if __name__ == "__main__":
+    import sys
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    _compare(args[0] if args else "chatbot_model.pth", "--int8" in sys.argv)
@@ -0,0 +1,78 @@
+# shared/overlay.py
+"""
+Recognition overlay drawn as Tk Canvas items above the preview image.
+
+Face boxes, name labels and the FPS counter are persistent canvas items that
+are moved/retexted only when the recognition result, the FPS value or the
+picture geometry actually changes, so the video frames themselves are never
+drawn on. Items for faces that went away are hidden and reused later.
+"""
+
+BOX_COLOR = "#f42a03"
+LABEL_H = 26
+
+
+class OverlayLayer:
+    def __init__(self, canvas, color=BOX_COLOR, font=("Segoe UI", 11)):
+        self.canvas = canvas
+        self.color = color
+        self.font = font
+        self._faces = []        # [(box, label_bg, label_text)] canvas item ids
+        self._fps = None        # (bg, text) canvas item ids
+        self._last = None
+        self.updates = 0
+
+    def update(self, boxes, names, fps, size, geometry):
+        """
+        Show boxes (top, right, bottom, left) from a size=(w, h) analysis frame
+        on the picture at geometry=(x, y, nw, nh, scale). Returns True if any
+        canvas item had to change.
+        """
+        key = (tuple(map(tuple, boxes)), tuple(names), round(fps, 1), tuple(size), geometry)
+        if key == self._last:
+            return False
+        self._last = key
+        self.updates += 1
+
+        c = self.canvas
+        x0, y0, nw, nh, _ = geometry
+        sx, sy = nw / size[0], nh / size[1]
+        while len(self._faces) < len(boxes):
+            self._faces.append((
+                c.create_rectangle(0, 0, 0, 0, outline=self.color, width=3),
+                c.create_rectangle(0, 0, 0, 0, fill=self.color, outline=self.color),
+                c.create_text(0, 0, anchor="nw", fill="white", font=self.font),
+            ))
+        for i, (box_id, bg_id, text_id) in enumerate(self._faces):
+            if i >= len(boxes):
+                for item in (box_id, bg_id, text_id):
+                    c.itemconfigure(item, state="hidden")
+                continue
+            t, r, b, l = boxes[i]
+            top, right, bottom, left = y0 + int(t*sy), x0 + int(r*sx), y0 + int(b*sy), x0 + int(l*sx)
+            c.coords(box_id, left, top, right, bottom)
+            c.coords(bg_id, left-3, top - LABEL_H, right+3, top)
+            c.coords(text_id, left+6, top - LABEL_H + 4)
+            c.itemconfigure(text_id, text=names[i] or "Unknown")
+            for item in (box_id, bg_id, text_id):
+                c.itemconfigure(item, state="normal")
+
+        # FPS (top-right of the picture)
+        if self._fps is None:
+            self._fps = (c.create_rectangle(0, 0, 0, 0, fill="black", outline="black"),
+                         c.create_text(0, 0, anchor="nw", fill="#00ff00", font=self.font))
+        bg_id, text_id = self._fps
+        right_edge = x0 + nw
+        c.coords(bg_id, right_edge-120, y0+6, right_edge-6, y0+28)
+        c.coords(text_id, right_edge-114, y0+8)
+        c.itemconfigure(text_id, text=f"FPS: {fps:.1f}")
+        for item in self._fps:
+            c.itemconfigure(item, state="normal")
+        return True
+
+    def clear(self):
+        """Hide every overlay item; the next update() redraws."""
+        for group in self._faces + ([self._fps] if self._fps else []):
+            for item in group:
+                self.canvas.itemconfigure(item, state="hidden")
+        self._last = None
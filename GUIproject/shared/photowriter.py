@@ -0,0 +1,170 @@
+# shared/photowriter.py
+"""
+Background JPEG saving for the capture screen.
+
+PhotoWriter.submit() returns immediately. A single checker thread runs the
+cheap quality gates in submission order (so "duplicate of the previous save"
+is well defined), then hands accepted frames to a small thread pool that
+encodes and writes the JPEGs; cv2 releases the GIL while encoding. Outcomes
+come back through results() as (path, None) for a saved file or
+(None, reason) for a rejected frame, for the Tk loop to drain.
+
+Gates (see QualityGate):
+  blur       variance of the Laplacian on a 320 px wide grey copy
+  no face    no HOG face found (skipped without face_recognition)
+  duplicate  tiny thumbnail barely differs from the last accepted frame
+"""
+import os, queue, threading, logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+from shared.motion import thumbnail
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+try:
+    import face_recognition
+    FACE_LIB_OK = True
+except Exception:
+    FACE_LIB_OK = False
+
+GATE_WIDTH = 320
+
+log = logging.getLogger(__name__)
+
+
+def _grey_small(frame, bgr=True):
+    h, w = frame.shape[:2]
+    nw, nh = GATE_WIDTH, max(1, int(h * GATE_WIDTH / w))
+    if OPENCV_OK:
+        small = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY if bgr else cv2.COLOR_RGB2GRAY)
+    rgb = frame[:, :, ::-1] if bgr else frame
+    return np.asarray(Image.fromarray(np.ascontiguousarray(rgb)).resize((nw, nh)).convert("L"))
+
+
+def sharpness(frame, bgr=True):
+    """Variance of the Laplacian; low values mean a blurred frame."""
+    grey = _grey_small(frame, bgr)
+    if OPENCV_OK:
+        return float(cv2.Laplacian(grey, cv2.CV_64F).var())
+    g = grey.astype(np.float64)
+    lap = (g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:] - 4 * g[1:-1, 1:-1])
+    return float(lap.var())
+
+
+class QualityGate:
+    def __init__(self, min_sharpness=60.0, require_face=True, dup_threshold=3.0):
+        self.min_sharpness = float(min_sharpness)
+        self.require_face = require_face
+        self.dup_threshold = float(dup_threshold)   # mean abs grey difference
+        self._last = None
+        self._lock = threading.Lock()   # reset() may come from another thread than check()
+
+    def reset(self):
+        with self._lock:
+            self._last = None
+
+    def check(self, frame, bgr=True):
+        """None if the frame should be saved, otherwise the rejection reason."""
+        if self.min_sharpness > 0 and sharpness(frame, bgr) < self.min_sharpness:
+            return "blur"
+        thumb = thumbnail(frame)
+        with self._lock:
+            last = self._last
+        if (last is not None and last.shape == thumb.shape
+                and np.abs(thumb - last).mean() < self.dup_threshold):
+            return "duplicate"
+        if self.require_face and FACE_LIB_OK:
+            h, w = frame.shape[:2]
+            step = max(1, w // GATE_WIDTH)
+            small = frame[::step, ::step]
+            rgb = np.ascontiguousarray(small[:, :, ::-1] if bgr else small)
+            if not face_recognition.face_locations(rgb, model="hog"):
+                return "no face"
+        with self._lock:
+            self._last = thumb
+        return None
+
+
+class PhotoWriter:
+    def __init__(self, gate=None, workers=2, quality=95):
+        self.gate = gate if gate is not None else QualityGate()
+        self.quality = int(quality)
+        self._checker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photo-check")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="photo-write")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.saved = 0
+        self.rejected = {}
+
+    def submit(self, frame, folder, name, bgr=True):
+        """Queue one H x W x 3 uint8 frame; it must not be modified afterwards."""
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        # millisecond timestamp plus a running counter: bursts never collide
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        path = os.path.join(folder, f"{name}_{ts}_{counter:04d}.jpg")
+        self._checker.submit(self._check, frame, path, bgr)
+
+    def reset_gate(self):
+        """Forget the duplicate reference, in order with frames already submitted."""
+        if self.gate is not None:
+            self._checker.submit(self.gate.reset)
+
+    def results(self):
+        """Drain finished outcomes without blocking: list of (path, reason)."""
+        out = []
+        while True:
+            try:
+                out.append(self._results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def close(self, wait=True):
+        self._checker.shutdown(wait=wait)
+        self._pool.shutdown(wait=wait)
+
+    def _check(self, frame, path, bgr):
+        try:
+            reason = self.gate.check(frame, bgr) if self.gate is not None else None
+        except Exception as e:
+            # count under one fixed key; the message goes to the log and the UI
+            log.exception("quality check failed for %s", path)
+            with self._lock:
+                self.rejected["error"] = self.rejected.get("error", 0) + 1
+            self._results.put((None, f"check failed: {e}"))
+            return
+        if reason is not None:
+            with self._lock:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            self._results.put((None, reason))
+            return
+        self._pool.submit(self._write, frame, path, bgr)
+
+    def _write(self, frame, path, bgr):
+        try:
+            if OPENCV_OK:
+                if not bgr:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                if not cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+                    raise RuntimeError("cv2.imwrite returned False")
+            else:
+                rgb = frame[:, :, ::-1] if bgr else frame
+                Image.fromarray(np.ascontiguousarray(rgb)).save(path, format="JPEG", quality=self.quality)
+        except Exception as e:
+            log.exception("could not write %s", path)
+            self._results.put((None, f"write failed: {e}"))
+            return
+        with self._lock:
+            self.saved += 1
+        self._results.put((path, None))
@@ -0,0 +1,80 @@
+# shared/preview.py
+"""
+Camera preview rendering into a Tk widget.
+
+PreviewRenderer keeps one ImageTk.PhotoImage per widget size and updates it in
+place with paste(), so a tick never creates a Tk image; a new one is made only
+when the widget is resized. Letterbox geometry and the background bars come
+from the Letterboxer and are likewise rebuilt only on resize. Ticks whose frame
+sequence number was already shown return without touching Tk at all.
+
+The widget may be a Label (image option) or a Canvas, where the frame is one
+image item at the bottom of the stacking order so overlay items
+(shared/overlay.py) can sit above it.
+"""
+import tkinter as tk
+from PIL import Image, ImageTk
+
+from shared.frames import Letterboxer, CYAN_RGB
+
+
+class PreviewRenderer:
+    def __init__(self, widget, bg=CYAN_RGB):
+        self.widget = widget
+        self._letterbox = Letterboxer(bg)
+        self._photo = None
+        self._size = None
+        self._last_seq = None
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+        self._image_item = self._text_item = None
+        if isinstance(widget, tk.Canvas):
+            self._image_item = widget.create_image(0, 0, anchor="nw")
+            self._text_item = widget.create_text(0, 0, text="", font=("Segoe UI", 14))
+
+    @property
+    def geometry(self):
+        """(x, y, nw, nh, scale) of the picture inside the widget, or None."""
+        return self._letterbox.geometry
+
+    def render(self, frame, seq, w, h, bgr=False, draw=None):
+        """
+        Show an H x W x 3 uint8 frame letterboxed into a w x h widget.
+        draw(img, geometry), if given, can draw overlays on the PIL image first.
+        Returns False when seq was already on screen and nothing was done.
+        """
+        if seq is not None and seq == self._last_seq and (w, h) == self._size:
+            self.frames_skipped += 1
+            return False
+        canvas, geometry = self._letterbox.fit(frame, w, h, bgr=bgr)
+        img = Image.fromarray(canvas)
+        if draw is not None:
+            draw(img, geometry)
+
+        if self._photo is None or self._size != (w, h):
+            self._photo = ImageTk.PhotoImage(img)
+            self._size = (w, h)
+            self._show(self._photo, "")
+        else:
+            self._photo.paste(img)   # same Tk image, new pixels
+        self._last_seq = seq
+        self.frames_shown += 1
+        return True
+
+    def clear(self, text=""):
+        """Blank the widget (optionally showing text); the next render starts fresh."""
+        self._show("", text)
+        self._photo = None
+        self._size = None
+        self._last_seq = None
+
+    def _show(self, image, text):
+        if self._image_item is None:
+            self.widget.configure(image=image, text=text)
+            return
+        c = self.widget
+        c.itemconfigure(self._image_item, image=image)
+        c.itemconfigure(self._text_item, text=text)
+        if text:
+            c.coords(self._text_item, c.winfo_width() / 2, c.winfo_height() / 2)
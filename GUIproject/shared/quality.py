@@ -0,0 +1,96 @@
+# shared/quality.py
+"""
+Adaptive quality control for FaceIdentifier.
+
+The controller watches how long each recognition frame takes (amortised over
+detection and tracking-only frames with an EMA) and walks a ladder of quality
+levels to stay within a frame budget:
+  - too slow for `patience` frames in a row  -> one level cheaper
+  - well under budget (below `headroom`)     -> one level richer
+Each level sets the downscale factor applied to the analysis image, the
+face_recognition landmark model ("large"/"small") and the detection cadence.
+start=(scaler, model, detect_every) seeds the controller with the caller's own
+settings (None fields come from start_level): it starts at that level, which is
+added to the ladder in cost order if it is not already on it.
+"""
+
+# (scaler, landmark model, detect_every), richest first
+DEFAULT_LEVELS = [
+    (1, "large", 3),
+    (2, "large", 3),
+    (2, "small", 5),
+    (3, "small", 8),
+    (4, "small", 12),
+]
+
+
+class QualityController:
+    def __init__(self, budget_ms=60.0, levels=None, start_level=1, start=None,
+                 alpha=0.2, headroom=0.5, patience=10):
+        self.budget_ms = float(budget_ms)
+        self.levels = list(levels or DEFAULT_LEVELS)
+        self.level = min(max(0, int(start_level)), len(self.levels) - 1)
+        if start is not None:
+            self.level = self._seed(start)
+        self.alpha = float(alpha)
+        self.headroom = float(headroom)
+        self.patience = max(1, int(patience))
+
+        self.ema_ms = None
+        self.stage_ms = {}
+        self._over = 0
+        self._under = 0
+
+    def _seed(self, start):
+        level = tuple(v if v is not None else d for v, d in zip(start, self.levels[self.level]))
+        if level in self.levels:
+            return self.levels.index(level)
+        # richest first: smaller scaler, then the large model, then denser detection
+        cost = lambda lv: (lv[0], lv[1] != "large", lv[2])
+        i = next((i for i, lv in enumerate(self.levels) if cost(lv) > cost(level)), len(self.levels))
+        self.levels.insert(i, level)
+        return i
+
+    @property
+    def current(self):
+        scaler, model, detect_every = self.levels[self.level]
+        return {"scaler": scaler, "model": model, "detect_every": detect_every}
+
+    def record(self, total_ms, stage_ms=None):
+        """
+        Feed one frame's latency. Returns True when the level changed and the
+        new settings should be applied.
+        """
+        self.stage_ms = dict(stage_ms or {})
+        if self.ema_ms is None:
+            self.ema_ms = float(total_ms)
+        else:
+            self.ema_ms += self.alpha * (float(total_ms) - self.ema_ms)
+
+        if self.ema_ms > self.budget_ms:
+            self._over += 1
+            self._under = 0
+        elif self.ema_ms < self.budget_ms * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.patience and self.level < len(self.levels) - 1:
+            return self._step(+1)
+        if self._under >= self.patience and self.level > 0:
+            return self._step(-1)
+        return False
+
+    def _step(self, delta):
+        self.level += delta
+        self._over = self._under = 0
+        self.ema_ms = None  # cost profile changed; start measuring afresh
+        return True
+
+    def report(self):
+        """Settings + measurements, for display or logging."""
+        out = dict(self.current)
+        out.update(level=self.level, budget_ms=self.budget_ms,
+                   ema_ms=self.ema_ms, stage_ms=dict(self.stage_ms))
+        return out
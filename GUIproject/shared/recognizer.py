@@ -0,0 +1,205 @@
+# shared/recognizer.py
+import threading, time, logging
+from collections import namedtuple
+import numpy as np
+
+# One finished recognition pass.
+#   seq     sequence number of the submitted frame
+#   size    (width, height) of the analysed frame; boxes are in this space
+#   boxes   (top, right, bottom, left) per face
+#   names   matched name or "Unknown" per face
+#   fps     recognition rate reported by the identifier
+#   latency seconds spent inside the identifier for this frame
+#   settings identifier.settings() after the frame, if it provides one
+#   errors  frames whose recognition raised so far (see RecognitionWorker.errors)
+RecognitionResult = namedtuple("RecognitionResult", "seq size boxes names fps latency settings errors")
+
+ERROR_LOG_INTERVAL = 10.0   # seconds between repeated "recognition failed" log lines
+
+log = logging.getLogger(__name__)
+
+
+class LatestSlot:
+    """
+    Single-item mailbox that keeps only the newest value.
+    put() never blocks; an unread value is overwritten (and counted as dropped).
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for a value; returns None on timeout."""
+        with self._cond:
+            if not self._has_item:
+                self._cond.wait(timeout)
+            if not self._has_item:
+                return None
+            item, self._item, self._has_item = self._item, None, False
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._item, self._has_item = None, False
+
+
+class RecognitionWorker:
+    """
+    Runs FaceIdentifier.annotate_pil on a background thread.
+    The UI submits frames as fast as it displays them; the worker always takes
+    the most recent one (older unprocessed frames are dropped) and publishes
+    its result, which the UI picks up with latest() on its own schedule.
+    An optional gate (shared/motion.py MotionGate) is consulted first; frames
+    it rejects skip recognition and the previous result stays current.
+    Instead of submit(), the worker can pull RGB frames itself from a FrameBus
+    subscription passed to start(source=...). An identifier with a poll()
+    method (shared/facepool.py) is polled on ticks without a frame to analyse,
+    so asynchronous results still arrive on a static scene.
+    A frame whose recognition raises is skipped; the first failure is logged
+    with its traceback, later ones at most every ERROR_LOG_INTERVAL seconds,
+    and errors / last_error count them.
+    """
+    def __init__(self, identifier, gate=None, name="recognition"):
+        self.identifier = identifier
+        self.gate = gate
+        self.name = name
+        self._slot = LatestSlot()
+        self._result = None
+        self._result_lock = threading.Lock()
+        self._seq = 0
+        self._thread = None
+        self._source = None
+        self._stop = threading.Event()   # the current run's; each run gets a fresh one
+        self._run_lock = threading.Lock()   # held by the run that owns the identifier
+        self.errors = 0
+        self.last_error = None
+        self._error_logged = None   # monotonic time of the last error log line
+
+    @property
+    def dropped(self):
+        if self._source is not None:
+            return self._source.dropped
+        return self._slot.dropped
+
+    @property
+    def frames_skipped(self):
+        return self.gate.frames_skipped if self.gate is not None else 0
+
+    def start(self, source=None):
+        """
+        Start a run. Never blocks: if a stopped run is still finishing a frame,
+        the new one waits for it on its own thread before touching the identifier.
+        """
+        if self._thread and self._thread.is_alive() and not self._stop.is_set():
+            return
+        self._source = source
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop, source),
+                                        name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, clear=True):
+        """Stop the worker; by default also forget the last result."""
+        self._stop.set()
+        self._slot.clear()
+        if clear:
+            with self._result_lock:
+                self._result = None
+
+    def submit(self, frame, seq=None, bgr=False):
+        """
+        Hand a frame to the worker: a PIL RGB image, or an H x W x 3 uint8
+        array (BGR camera frame with bgr=True). It must not be modified afterwards.
+        """
+        if seq is None:
+            self._seq += 1
+            seq = self._seq
+        self._slot.put((seq, frame, bgr))
+        return seq
+
+    def latest(self):
+        """Most recent RecognitionResult, or None if nothing finished yet."""
+        with self._result_lock:
+            return self._result
+
+    def _next(self, source, timeout):
+        if source is None:
+            return self._slot.get(timeout=timeout)
+        got = source.get(timeout=timeout)
+        return None if got is None else (got[0], got[2], False)
+
+    def _run(self, stop, source):
+        with self._run_lock:   # one run at a time: the identifier is not thread-safe
+            if not stop.is_set():
+                self._loop(stop, source)
+
+    def _loop(self, stop, source):
+        # frames from before the last stop are stale for any tracker state
+        reset = getattr(self.identifier, "reset_tracking", None)
+        if callable(reset):
+            reset()
+        if self.gate is not None:
+            self.gate.reset()
+        poll = getattr(self.identifier, "poll", None)
+        while not stop.is_set():
+            item = self._next(source, timeout=0.2)
+            if item is None or (self.gate is not None and not self.gate.changed(item[1])):
+                # nothing new to analyse (static scene): keep the previous result,
+                # but pick up work an asynchronous engine finished meanwhile
+                if poll is not None:
+                    self._poll(poll, stop)
+                continue
+            seq, frame, bgr = item
+            t0 = time.perf_counter()
+            try:
+                if isinstance(frame, np.ndarray):
+                    size = (frame.shape[1], frame.shape[0])
+                    boxes, names, fps = self.identifier.annotate_array(frame, bgr=bgr)
+                else:
+                    size = frame.size
+                    boxes, names, fps = self.identifier.annotate_pil(frame)
+            except Exception as e:
+                self._on_error(e)
+                continue
+            latency = time.perf_counter() - t0
+            settings = self.identifier.settings() if hasattr(self.identifier, "settings") else None
+            res = RecognitionResult(seq, size, boxes, names, fps, latency, settings, self.errors)
+            if stop.is_set():
+                break
+            with self._result_lock:
+                self._result = res
+
+    def _poll(self, poll, stop):
+        try:
+            got = poll()
+        except Exception as e:
+            self._on_error(e)
+            return
+        with self._result_lock:
+            last = self._result
+            if got is None or last is None or stop.is_set():
+                return
+            boxes, names, fps = got
+            self._result = last._replace(boxes=boxes, names=names, fps=fps, errors=self.errors)
+
+    def _on_error(self, e):
+        self.errors += 1
+        self.last_error = e
+        now = time.monotonic()
+        if self._error_logged is None:
+            log.exception("recognition failed; skipping the frame")
+        elif now - self._error_logged >= ERROR_LOG_INTERVAL:
+            log.warning("recognition failed %d times so far, latest: %r", self.errors, e)
+        else:
+            return
+        self._error_logged = now
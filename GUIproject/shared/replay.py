@@ -0,0 +1,141 @@
+# shared/replay.py
+"""
+Recorded-footage camera backend.
+
+ReplaySource looks like a cv2.VideoCapture (isOpened/read/set/get/release) but
+plays a video file or a directory of images, so CameraManager and everything
+downstream behave exactly as with a live device. pacing="realtime" makes read()
+block until the next frame is due (like a webcam); pacing="fast" returns frames
+as quickly as they decode, for benchmarks. loop=True restarts at the end;
+otherwise read() fails from then on and `ended` is True, which CameraManager
+treats as the end of the stream rather than a lost device.
+
+Benchmark the recognition pipeline on a recording:
+    python -m shared.replay footage.mp4 [encodings.f32]
+"""
+import os, time
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_FPS = 30.0
+
+
+class ReplaySource:
+    def __init__(self, path, pacing="realtime", loop=True, fps=None):
+        self.path = path
+        self.pacing = pacing
+        self.loop = loop
+        self._video = None
+        self._images = None
+        self._pos = 0
+        self._opened = False
+        self.ended = False
+
+        if os.path.isdir(path):
+            self._images = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                  if f.lower().endswith(IMAGE_EXTS))
+            self._opened = bool(self._images)
+            native_fps = None
+        elif OPENCV_OK and os.path.isfile(path):
+            self._video = cv2.VideoCapture(path)
+            self._opened = self._video.isOpened()
+            native_fps = self._video.get(cv2.CAP_PROP_FPS) if self._opened else None
+        else:
+            native_fps = None
+        self.fps = float(fps or native_fps or DEFAULT_FPS)
+
+        self._t0 = None
+        self._frames = 0
+
+    # cv2.VideoCapture interface
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        frame = self._next_frame()
+        if frame is None:
+            self.ended = True
+            return False, None
+        self._pace()
+        return True, frame
+
+    def set(self, prop, value):
+        # resolution/format requests mean nothing for a recording
+        return False
+
+    def get(self, prop):
+        if OPENCV_OK and prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if self._video is not None:
+            return self._video.get(prop)
+        return 0.0
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+        self._opened = False
+
+    # internals
+    def _next_frame(self):
+        if self._images is not None:
+            for _ in range(len(self._images)):
+                if self._pos >= len(self._images):
+                    if not self.loop:
+                        return None
+                    self._pos = 0
+                frame = cv2.imread(self._images[self._pos])
+                self._pos += 1
+                if frame is not None:
+                    return frame
+            return None
+
+        ok, frame = self._video.read()
+        if not ok and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._video.read()
+        return frame if ok else None
+
+    def _pace(self):
+        if self.pacing != "realtime":
+            return
+        now = time.monotonic()
+        if self._t0 is None:
+            self._t0 = now
+        due = self._t0 + self._frames / self.fps
+        self._frames += 1
+        if due > now:
+            time.sleep(due - now)
+        elif now - due > 1.0:
+            # fell far behind (e.g. paused): resync instead of bursting
+            self._t0, self._frames = now, 1
+
+
+def _bench(path, encodings_path):
+    from shared.faceid import FaceIdentifier
+    src = ReplaySource(path, pacing="fast", loop=False)
+    fid = FaceIdentifier(encodings_path=encodings_path, analysis_width=640)
+    n, t0 = 0, time.perf_counter()
+    while True:
+        ok, frame = src.read()
+        if not ok:
+            break
+        fid.annotate_array(frame, bgr=True)
+        n += 1
+    dt = time.perf_counter() - t0
+    print(f"{n} frames in {dt:.2f}s -> {n / max(dt, 1e-9):.1f} fps")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: python -m shared.replay <video-or-image-dir> [encodings.f32]")
+        sys.exit(2)
+    _bench(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "encodings.f32")
@@ -0,0 +1,170 @@
+# shared/tracking.py
+"""
+Lightweight face tracking so FaceIdentifier does not detect+encode every frame.
+
+Full detection runs every `detect_every` frames, or as soon as a track is
+lost. In between, boxes are carried forward with sparse Lucas-Kanade
+optical flow (boxes simply hold still if OpenCV is missing). Detections are
+associated to tracks by IoU; a matched track keeps its cached identity, so
+only new tracks (and, optionally, tracks still "Unknown") are encoded.
+"""
+import numpy as np
+
+try:
+    import cv2
+    OPENCV_OK = True
+except Exception:
+    OPENCV_OK = False
+    cv2 = None
+
+
+def iou(a, b):
+    """IoU of two (top, right, bottom, left) boxes."""
+    t, r = max(a[0], b[0]), min(a[1], b[1])
+    btm, l = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, r - l) * max(0, btm - t)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, tid, box):
+        self.id = tid
+        self.box = tuple(int(v) for v in box)
+        self.name = "Unknown"
+        self.match = None       # (name, distance, candidates) from FaceIdentifier.match
+        self.misses = 0         # consecutive detection passes without a matching box
+        self.hits = 1
+
+
+class FaceTracker:
+    """
+    step(frame_rgb, detect, identify) -> list[Track]
+      detect(frame_rgb)           -> list of (top, right, bottom, left) boxes
+      identify(frame_rgb, boxes)  -> list of (name, distance, candidates), one per box
+    All boxes are in the coordinates of frame_rgb.
+    reset() may be called from any thread; it takes effect at the start of the
+    next step(), so a step already running cannot bring old tracks back.
+    """
+    def __init__(self, detect_every=5, iou_threshold=0.3, max_misses=1,
+                 retry_unknown=True, min_flow_points=4):
+        self.detect_every = max(1, int(detect_every))
+        self.iou_threshold = float(iou_threshold)
+        self.max_misses = max(0, int(max_misses))
+        self.retry_unknown = retry_unknown
+        self.min_flow_points = int(min_flow_points)
+
+        self.tracks = []
+        self._next_id = 1
+        self._frame_idx = 0
+        self._prev_gray = None
+        self._force_detect = True
+        self._reset_pending = False
+        self.detections = 0      # how many full detection passes ran
+        self.encodes = 0         # how many faces were encoded
+
+    def reset(self):
+        self._reset_pending = True
+
+    def step(self, frame_rgb, detect, identify):
+        if self._reset_pending:
+            self._reset_pending = False
+            self.tracks = []
+            self._prev_gray = None
+            self._force_detect = True
+        gray = self._to_gray(frame_rgb)
+        if self.tracks and self._prev_gray is not None and gray is not None \
+                and self._prev_gray.shape == gray.shape:
+            self._propagate(self._prev_gray, gray)
+        self._prev_gray = gray
+
+        run_detect = self._force_detect or self._frame_idx % self.detect_every == 0
+        self._frame_idx += 1
+        if run_detect:
+            self._force_detect = False
+            self.detections += 1
+            self._associate(frame_rgb, detect(frame_rgb), identify)
+        return list(self.tracks)
+
+    # association
+    def _associate(self, frame_rgb, boxes, identify):
+        pairs = []
+        for ti, tr in enumerate(self.tracks):
+            for bi, box in enumerate(boxes):
+                o = iou(tr.box, box)
+                if o >= self.iou_threshold:
+                    pairs.append((o, ti, bi))
+        pairs.sort(reverse=True)
+
+        used_t, used_b = set(), set()
+        for _, ti, bi in pairs:
+            if ti in used_t or bi in used_b:
+                continue
+            used_t.add(ti)
+            used_b.add(bi)
+            tr = self.tracks[ti]
+            tr.box = tuple(int(v) for v in boxes[bi])
+            tr.misses = 0
+            tr.hits += 1
+
+        kept = []
+        for ti, tr in enumerate(self.tracks):
+            if ti not in used_t:
+                tr.misses += 1
+                if tr.misses > self.max_misses:
+                    continue
+            kept.append(tr)
+        self.tracks = kept
+
+        for bi, box in enumerate(boxes):
+            if bi not in used_b:
+                self.tracks.append(Track(self._next_id, box))
+                self._next_id += 1
+
+        # Encode only what has no identity yet
+        todo = [tr for tr in self.tracks
+                if tr.misses == 0 and (tr.match is None or (self.retry_unknown and tr.name == "Unknown"))]
+        if todo:
+            matches = identify(frame_rgb, [tr.box for tr in todo])
+            self.encodes += len(todo)
+            for tr, m in zip(todo, matches):
+                tr.match = m
+                tr.name = m[0]
+
+    # optical flow
+    def _to_gray(self, frame_rgb):
+        if not OPENCV_OK:
+            return None
+        return cv2.cvtColor(np.ascontiguousarray(frame_rgb), cv2.COLOR_RGB2GRAY)
+
+    def _propagate(self, prev, cur):
+        h, w = cur.shape[:2]
+        alive = []
+        for tr in self.tracks:
+            t, r, b, l = tr.box
+            t, b = max(0, t), min(h, b)
+            l, r = max(0, l), min(w, r)
+            if b - t < 4 or r - l < 4:
+                self._force_detect = True
+                continue
+            mask = np.zeros_like(prev)
+            mask[t:b, l:r] = 255
+            pts = cv2.goodFeaturesToTrack(prev, maxCorners=30, qualityLevel=0.01,
+                                          minDistance=3, mask=mask)
+            if pts is None or len(pts) < self.min_flow_points:
+                alive.append(tr)  # nothing to follow; hold the box until next detection
+                continue
+            nxt, status, _ = cv2.calcOpticalFlowPyrLK(prev, cur, pts, None)
+            ok = status.reshape(-1) == 1
+            if ok.sum() < self.min_flow_points:
+                # lost it: drop the track and re-detect on the next frame
+                self._force_detect = True
+                continue
+            dx, dy = np.median((nxt - pts).reshape(-1, 2)[ok], axis=0)
+            tr.box = (int(round(tr.box[0] + dy)), int(round(tr.box[1] + dx)),
+                      int(round(tr.box[2] + dy)), int(round(tr.box[3] + dx)))
+            alive.append(tr)
+        self.tracks = alive
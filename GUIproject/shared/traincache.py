@@ -0,0 +1,179 @@
+# shared/traincache.py
+"""
+Per-image encoding cache for incremental face training.
+
+Every processed image is remembered by path together with its size, mtime and
+SHA-1. An entry is reused when size and mtime still match; if only the mtime
+moved (copied/touched file) the hash decides. Images that disappeared from the
+dataset are pruned, so a retrain only encodes added or changed photos.
+
+Each entry also remembers its rows in the encodings store (shared/encstore.py),
+so sync_store() can tombstone dropped images and append new ones instead of
+rewriting the gallery.
+
+On disk: <stem>.json (index) + <stem>.npy (float32 matrix of all cached rows).
+"""
+import os, json, hashlib
+import numpy as np
+
+CACHE_VERSION = 1
+ENC_DIM = 128
+
+
+def file_sha1(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class TrainingCache:
+    def __init__(self, path):
+        self.path = path
+        self.matrix_path = os.path.splitext(path)[0] + ".npy"
+        self.entries = {}   # abs path -> {"size", "mtime_ns", "sha1", "name", "encodings", "rows"}
+        self.store_rows = None  # size of the encodings store the "rows" [start, count] refer to
+        self._dead = []         # store rows of entries dropped or replaced since load()
+        self._new = set()       # keys put() since load(); not in the store yet
+
+    # persistence
+    def load(self):
+        self.entries, self.store_rows = {}, None
+        self._dead, self._new = [], set()
+        if not (os.path.exists(self.path) and os.path.exists(self.matrix_path)):
+            return self
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != CACHE_VERSION:
+                return self
+            mat = np.load(self.matrix_path, allow_pickle=False)
+        except Exception:
+            return self  # unreadable cache == empty cache
+        self.store_rows = index.get("store_rows")
+        for path, e in index.get("entries", {}).items():
+            start, count = e.pop("start"), e.pop("count")
+            e["encodings"] = mat[start:start + count]
+            self.entries[path] = e
+        return self
+
+    def save(self):
+        rows, index = [], {}
+        start = 0
+        for path, e in self.entries.items():
+            encs = np.asarray(e["encodings"], dtype=np.float32).reshape(-1, ENC_DIM)
+            rows.append(encs)
+            meta = {k: v for k, v in e.items() if k != "encodings"}
+            meta.update(start=start, count=len(encs))
+            index[path] = meta
+            start += len(encs)
+        mat = np.concatenate(rows) if rows else np.zeros((0, ENC_DIM), dtype=np.float32)
+
+        tmp = self.matrix_path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, mat)
+        os.replace(tmp, self.matrix_path)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "store_rows": self.store_rows, "entries": index}, f)
+        os.replace(tmp, self.path)
+
+    # lookups
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def is_fresh(self, path):
+        """True if the cached result for path still matches the file on disk."""
+        e = self.entries.get(self._key(path))
+        if e is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != e["size"]:
+            return False
+        if st.st_mtime_ns == e["mtime_ns"]:
+            return True
+        # same size, new mtime: compare content
+        if file_sha1(path) == e["sha1"]:
+            e["mtime_ns"] = st.st_mtime_ns
+            return True
+        return False
+
+    def put(self, path, name, encodings):
+        st = os.stat(path)
+        key = self._key(path)
+        self._forget(key)
+        self._new.add(key)
+        self.entries[key] = {
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_sha1(path),
+            "name": name, "encodings": np.asarray(encodings, dtype=np.float32).reshape(-1, ENC_DIM),
+        }
+
+    def prune(self, paths):
+        """Drop entries for images no longer in paths; returns how many were dropped."""
+        keep = {self._key(p) for p in paths}
+        gone = [k for k in self.entries if k not in keep]
+        for k in gone:
+            self._forget(k)
+            del self.entries[k]
+        return len(gone)
+
+    def _forget(self, key):
+        e = self.entries.get(key)
+        if e is not None and "rows" in e and key not in self._new:
+            self._dead.append(e["rows"])
+
+    # encodings store
+    def sync_store(self, store, max_dead=0.25):
+        """
+        Bring an EncodingStore in line with the cache: tombstone the rows of
+        dropped or replaced images and append the new ones. The whole store is
+        rewritten instead when it is not the one the cache last wrote, or when
+        more than max_dead of its rows would be tombstones. Returns the number
+        of rows written; save() afterwards so the row ids are remembered.
+        """
+        from shared.encstore import StoreFormatError
+        try:
+            size = store.size()
+        except (OSError, StoreFormatError):
+            size = None
+        new = [k for k in self.entries if k in self._new]
+        added = sum(len(self.entries[k]["encodings"]) for k in new)
+        dead = store.dead_count() + sum(n for _, n in self._dead) if size is not None else 0
+        if (size is None or size != self.store_rows
+                or any("rows" not in e for k, e in self.entries.items() if k not in self._new)
+                or dead > max_dead * (size + added)):
+            return self._rewrite(store)
+
+        for start, count in self._dead:
+            store.tombstone(np.arange(start, start + count))
+        if new:
+            encs = np.concatenate([self.entries[k]["encodings"] for k in new])
+            names = [self.entries[k]["name"] for k in new for _ in self.entries[k]["encodings"]]
+            start = store.append(encs, names)[0] if added else size
+            for k in new:
+                count = len(self.entries[k]["encodings"])
+                self.entries[k]["rows"] = [start, count]
+                start += count
+        self._synced(size + added)
+        return added
+
+    def _rewrite(self, store):
+        encs, names, start = [], [], 0
+        for e in self.entries.values():
+            count = len(e["encodings"])
+            e["rows"] = [start, count]
+            start += count
+            encs.append(e["encodings"])
+            names.extend([e["name"]] * count)
+        store.write(np.concatenate(encs) if encs else np.zeros((0, ENC_DIM), dtype=np.float32), names)
+        self._synced(start)
+        return start
+
+    def _synced(self, size):
+        self.store_rows = size
+        self._dead, self._new = [], set()
@@ -0,0 +1,71 @@
+# shared/trainpool.py
+"""
+Parallel dataset encoding for the training screen.
+
+encode_images() spreads images over a process pool in chunks and yields
+(path, encodings) as each chunk finishes; encodings is None when the image
+could not be read or encoding failed. Heavy libs are imported inside the
+workers, which are spawned rather than forked from the threaded Tk process.
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+
+def encode_image(path):
+    """Detect (HOG) and encode every face in one image file."""
+    import cv2
+    import face_recognition
+    image = cv2.imread(path)
+    if image is None:
+        return path, None
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    # You can switch model="cnn" if you have dlib GPU and want accuracy over speed
+    boxes = face_recognition.face_locations(rgb, model="hog")
+    encodings = face_recognition.face_encodings(rgb, boxes)
+    return path, [np.asarray(e, dtype=np.float32) for e in encodings]
+
+
+def _encode_guarded(path):
+    try:
+        return encode_image(path)
+    except Exception:
+        return path, None  # one bad file must not sink the chunk (or the run)
+
+
+def _encode_chunk(paths):
+    return [_encode_guarded(p) for p in paths]
+
+
+def encode_images(paths, workers=None, chunksize=None, should_stop=None):
+    """
+    Yield (path, encodings) for every path, in completion order.
+    should_stop() is polled between chunks; when it returns True, pending
+    chunks are cancelled and the generator ends.
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        for p in paths:
+            if should_stop and should_stop():
+                return
+            yield _encode_guarded(p)
+        return
+
+    if chunksize is None:
+        # small enough for smooth progress, big enough to amortise IPC
+        chunksize = max(1, min(16, len(paths) // (workers * 4)))
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                               mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [pool.submit(_encode_chunk, c) for c in chunks]
+        for fut in as_completed(futures):
+            if should_stop and should_stop():
+                return
+            for result in fut.result():
+                yield result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)